@@ -0,0 +1,156 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('yatube.metrics')
+
+# Границы корзин гистограммы: миллисекунды для времени, штуки для SQL.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+METRICS = ('total_ms', 'sql_count', 'sql_ms', 'template_ms')
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, без хранения значений."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def percentile(self, fraction):
+        """Верхняя граница корзины, в которую попадает перцентиль."""
+        if not self.total:
+            return 0
+        rank = fraction * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else None
+        return None
+
+    def snapshot(self):
+        return {
+            'count': self.total,
+            'mean': self.sum / self.total if self.total else 0,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.last_log = time.monotonic()
+
+    def record(self, view_name, **values):
+        with self.lock:
+            histograms = self.views.setdefault(
+                view_name, {name: Histogram() for name in METRICS}
+            )
+            for name, value in values.items():
+                histograms[name].add(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view_name: {
+                    name: histogram.snapshot()
+                    for name, histogram in histograms.items()
+                }
+                for view_name, histograms in self.views.items()
+            }
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def maybe_log(self, interval):
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_log < interval:
+                return
+            self.last_log = now
+        for view_name, stats in sorted(self.snapshot().items()):
+            logger.info(
+                '%s: %d запросов, p50 %s мс, p95 %s мс, SQL в среднем '
+                '%.1f шт. / %.1f мс, шаблоны %.1f мс',
+                view_name,
+                stats['total_ms']['count'],
+                stats['total_ms']['p50'],
+                stats['total_ms']['p95'],
+                stats['sql_count']['mean'],
+                stats['sql_ms']['mean'],
+                stats['template_ms']['mean'],
+            )
+
+
+registry = Registry()
+
+
+class RequestRecorder:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_seconds += time.perf_counter() - start
+
+
+_local = threading.local()
+
+
+@contextmanager
+def recording(recorder):
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = None
+
+
+def instrument_templates():
+    """Оборачивает Template.render, чтобы считать время шаблонов.
+
+    Вызывается только при включённой выборке; вложенные шаблоны
+    (include, render_to_string в тегах) не учитываются дважды.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'instrumented', False):
+        return
+    original_render = Template.render
+
+    def render(self, *args, **kwargs):
+        recorder = getattr(_local, 'recorder', None)
+        if recorder is None:
+            return original_render(self, *args, **kwargs)
+        recorder.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original_render(self, *args, **kwargs)
+        finally:
+            recorder.template_depth -= 1
+            if not recorder.template_depth:
+                recorder.template_seconds += time.perf_counter() - start
+
+    render.instrumented = True
+    Template.render = render
@@ -0,0 +1,48 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import RequestRecorder, instrument_templates, recording, registry
+
+
+class MetricsMiddleware:
+    """Замеряет время, число SQL-запросов и время шаблонов по view.
+
+    При METRICS['SAMPLE_RATE'] == 0 middleware отключается целиком
+    и не стоит ничего.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.METRICS['SAMPLE_RATE']
+        self.log_interval = settings.METRICS['LOG_INTERVAL']
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        instrument_templates()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        recorder = RequestRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            stack.enter_context(recording(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        match = request.resolver_match
+        registry.record(
+            match.view_name if match else 'unresolved',
+            total_ms=total * 1000,
+            sql_count=recorder.sql_count,
+            sql_ms=recorder.sql_seconds * 1000,
+            template_ms=recorder.template_seconds * 1000,
+        )
+        if self.log_interval:
+            registry.maybe_log(self.log_interval)
+        return response
@@ -0,0 +1,104 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+
+
+def replica_aliases():
+    return settings.DATABASE_REPLICAS['ALIASES']
+
+
+class ReplicaRouter:
+    """Чтения внутри read_from_replica идут на реплику, остальное — в default.
+
+    После первой записи в запросе чтения до конца запроса тоже идут
+    в default, чтобы не прочитать с реплики устаревшие данные.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if replica and not getattr(_state, 'wrote', False):
+            return replica
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *replica_aliases()}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+
+def read_from_replica(view):
+    """Отправляет чтения GET-запроса на реплику.
+
+    Реплика выбирается одна на весь запрос, чтобы страница не собиралась
+    из реплик с разным отставанием. Не действует, если пользователь
+    недавно писал (см. ReplicaMiddleware): он должен видеть свои
+    изменения, даже если реплика отстаёт.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        aliases = replica_aliases()
+        if (
+            not aliases
+            or request.method not in SAFE_METHODS
+            or getattr(request, 'pin_primary', False)
+        ):
+            return view(request, *args, **kwargs)
+        previous = getattr(_state, 'replica', None)
+        _state.replica = previous or random.choice(aliases)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = previous
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут в default, даже под read_from_replica.
+
+    Нужно там, где прочитанное живёт дольше запроса: страница,
+    собранная с отстающей реплики, попала бы в кэш на весь TIMEOUT.
+    """
+    previous = getattr(_state, 'replica', None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+class ReplicaMiddleware:
+    """Закрепляет за пишущим пользователем основную базу.
+
+    Если за время запроса что-то записалось, ставится кука на
+    STICKY_SECONDS; пока она жива, read_from_replica читает из default.
+    """
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = settings.DATABASE_REPLICAS
+        request.pin_primary = config['COOKIE_NAME'] in request.COOKIES
+        _state.wrote = False
+        response = self.get_response(request)
+        if _state.wrote:
+            response.set_cookie(
+                config['COOKIE_NAME'], '1',
+                max_age=config['STICKY_SECONDS'], httponly=True,
+            )
+        return response
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from django.core.checks import Error, Tags, register
+from django.dispatch import receiver
+from django.template import TemplateSyntaxError, engines
+from django.utils.autoreload import autoreload_started, file_changed
+
+
+def template_dirs():
+    """Каталоги из DIRS всех движков шаблонов (у нас — templates/)."""
+    for backend in engines.all():
+        for directory in getattr(backend.engine, 'dirs', ()):
+            yield backend, Path(directory)
+
+
+def template_names():
+    for backend, directory in template_dirs():
+        for path in sorted(directory.rglob('*.html')):
+            yield backend, path.relative_to(directory).as_posix()
+
+
+def warm_templates():
+    """Компилирует все шаблоны заранее, чтобы первый запрос их не парсил.
+
+    С cached.Loader скомпилированный шаблон остаётся в памяти процесса.
+    """
+    count = 0
+    for backend, name in template_names():
+        backend.get_template(name)
+        count += 1
+    return count
+
+
+def reset_template_cache():
+    for backend in engines.all():
+        for loader in getattr(backend.engine, 'template_loaders', ()):
+            if hasattr(loader, 'reset'):
+                loader.reset()
+
+
+@register(Tags.templates, deploy=True)
+def check_templates_compile(app_configs, **kwargs):
+    errors = []
+    for backend, name in template_names():
+        try:
+            backend.get_template(name)
+        except TemplateSyntaxError as error:
+            errors.append(Error(
+                f'Шаблон {name} не компилируется: {error}',
+                id='core.E001',
+            ))
+    return errors
+
+
+@receiver(autoreload_started)
+def watch_template_dirs(sender, **kwargs):
+    for _, directory in template_dirs():
+        sender.watch_dir(directory, '**/*.html')
+
+
+@receiver(file_changed)
+def template_changed(sender, file_path, **kwargs):
+    """Правка шаблона сбрасывает кэш шаблонов без перезапуска runserver."""
+    path = Path(file_path)
+    for _, directory in template_dirs():
+        if directory in path.parents:
+            reset_template_cache()
+            return True
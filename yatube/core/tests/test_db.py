@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, override_settings
+
+
+class SQLitePragmasTest(SimpleTestCase):
+    """Два соединения к файловой базе, как у двух воркеров WSGI."""
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        self.settings_dict = {
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(tmp, 'db.sqlite3'),
+        }
+
+    def connect(self):
+        wrapper = connections['default'].__class__(self.settings_dict)
+        self.addCleanup(wrapper.close)
+        return wrapper.cursor()
+
+    def write_while_reading(self):
+        writer = self.connect()
+        writer.execute('CREATE TABLE post (id INTEGER PRIMARY KEY)')
+        writer.execute('INSERT INTO post DEFAULT VALUES')
+        reader = self.connect()
+        reader.execute('BEGIN')
+        reader.execute('SELECT COUNT(*) FROM post')
+        writer.execute('INSERT INTO post DEFAULT VALUES')
+        reader.execute('SELECT COUNT(*) FROM post')
+        self.assertEqual(reader.fetchone()[0], 1)
+        reader.execute('COMMIT')
+
+    def test_pragmas_applied(self):
+        cursor = self.connect()
+        cursor.execute('PRAGMA journal_mode')
+        self.assertEqual(cursor.fetchone()[0], 'wal')
+        cursor.execute('PRAGMA busy_timeout')
+        self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_writer_does_not_wait_for_reader(self):
+        self.write_while_reading()
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'DELETE', 'busy_timeout': 0,
+    })
+    def test_rollback_journal_locks(self):
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            self.write_while_reading()
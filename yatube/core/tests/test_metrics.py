@@ -0,0 +1,66 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import Histogram, registry
+
+User = get_user_model()
+
+SAMPLED = override_settings(METRICS={'SAMPLE_RATE': 1, 'LOG_INTERVAL': 0})
+
+
+class HistogramTest(TestCase):
+    def test_percentiles(self):
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.add(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 100)
+        self.assertEqual(snapshot['p50'], 50)
+        self.assertEqual(snapshot['p99'], 100)
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        registry.reset()
+
+    @SAMPLED
+    def test_records_view_metrics(self):
+        Client().get(reverse('posts:index'))
+        stats = registry.snapshot()['posts:index']
+        self.assertEqual(stats['total_ms']['count'], 1)
+        self.assertGreater(stats['sql_count']['mean'], 0)
+        self.assertGreater(stats['template_ms']['mean'], 0)
+
+    @override_settings(METRICS={'SAMPLE_RATE': 1, 'LOG_INTERVAL': 1e-9})
+    def test_summary_is_logged(self):
+        """Сводка доходит до обработчика из настроек, а не теряется."""
+        logger = logging.getLogger('yatube.metrics')
+        self.assertTrue(logger.isEnabledFor(logging.INFO))
+        self.assertTrue(any(
+            handler.level <= logging.INFO for handler in logger.handlers
+        ))
+        with self.assertLogs(logger, logging.INFO) as logs:
+            Client().get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+
+    def test_disabled_by_default(self):
+        self.assertEqual(settings.METRICS['SAMPLE_RATE'], 0)
+        Client().get(reverse('posts:index'))
+        self.assertEqual(registry.snapshot(), {})
+
+    @SAMPLED
+    def test_endpoint_is_staff_only(self):
+        url = reverse('metrics')
+        user = User.objects.create_user(username='user')
+        client = Client()
+        client.force_login(user)
+        self.assertEqual(client.get(url).status_code, 302)
+        user.is_staff = True
+        user.save()
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('metrics', response.json())
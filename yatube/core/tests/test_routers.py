@@ -0,0 +1,152 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.routers import ReplicaMiddleware, read_from_replica
+from posts.cache import INDEX_SCOPE, cache_feed_page
+from posts.models import Group
+
+User = get_user_model()
+
+REPLICAS = override_settings(DATABASE_REPLICAS={
+    'ALIASES': ['replica'],
+    'STICKY_SECONDS': 15,
+    'COOKIE_NAME': 'pin_primary',
+})
+
+
+@read_from_replica
+def read_view(request):
+    # QuerySet.db спрашивает роутер, запроса к базе нет.
+    return HttpResponse(User.objects.all().db)
+
+
+@read_from_replica
+def write_then_read_view(request):
+    router.db_for_write(User)
+    return read_view.__wrapped__(request)
+
+
+def write_view(request):
+    return HttpResponse(router.db_for_write(User))
+
+
+@REPLICAS
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def call(self, view, request):
+        return ReplicaMiddleware(view)(request)
+
+    def test_feed_reads_go_to_replica(self):
+        response = self.call(read_view, self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertNotIn('pin_primary', response.cookies)
+
+    def test_reads_outside_decorator_use_primary(self):
+        self.assertEqual(User.objects.all().db, 'default')
+        response = self.call(read_view, self.factory.post('/'))
+        self.assertEqual(response.content, b'default')
+
+    def test_write_pins_author_to_primary(self):
+        response = self.call(write_view, self.factory.post('/'))
+        self.assertEqual(response.content, b'default')
+        cookie = response.cookies['pin_primary']
+        self.assertEqual(cookie['max-age'], 15)
+        request = self.factory.get('/')
+        request.COOKIES['pin_primary'] = cookie.value
+        self.assertEqual(self.call(read_view, request).content, b'default')
+
+    def test_reads_after_write_use_primary(self):
+        response = self.call(write_then_read_view, self.factory.get('/'))
+        self.assertEqual(response.content, b'default')
+
+    @override_settings(DATABASE_REPLICAS={'ALIASES': []})
+    def test_without_replicas(self):
+        response = read_view(self.factory.get('/'))
+        self.assertEqual(response.content, b'default')
+
+
+def group_titles():
+    return ','.join(Group.objects.values_list('title', flat=True))
+
+
+@read_from_replica
+def titles_view(request):
+    # Два отдельных запроса: оба должны прийти с одной и той же базы.
+    return HttpResponse(f'{group_titles()}|{group_titles()}')
+
+
+@read_from_replica
+@cache_feed_page(INDEX_SCOPE)
+def cached_titles_view(request):
+    return HttpResponse(group_titles())
+
+
+@override_settings(DATABASE_REPLICAS={
+    'ALIASES': ['replica_a', 'replica_b'],
+    'STICKY_SECONDS': 15,
+    'COOKIE_NAME': 'pin_primary',
+})
+class ReplicaFilesTest(SimpleTestCase):
+    """Основная база и реплики — отдельные файлы SQLite с разными данными."""
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        original = connections['default']
+        self.addCleanup(connections.__setitem__, 'default', original)
+        for alias, title in (
+            ('default', 'primary'),
+            ('replica_a', 'replica_a'),
+            ('replica_b', 'replica_b'),
+        ):
+            wrapper = original.__class__(
+                {
+                    **original.settings_dict,
+                    'NAME': os.path.join(tmp, f'{alias}.sqlite3'),
+                },
+                alias,
+            )
+            self.addCleanup(wrapper.close)
+            connections[alias] = wrapper
+            if alias != 'default':
+                self.addCleanup(connections.__delitem__, alias)
+            with wrapper.schema_editor() as editor:
+                editor.create_model(Group)
+            Group.objects.using(alias).create(title=title, slug=title)
+        self.factory = RequestFactory()
+
+    def get(self, view):
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        return ReplicaMiddleware(view)(request).content.decode()
+
+    def test_request_reads_one_replica(self):
+        for _ in range(10):
+            first, second = self.get(titles_view).split('|')
+            self.assertIn(first, ('replica_a', 'replica_b'))
+            self.assertEqual(first, second)
+
+    @override_settings(POSTS_PAGE_CACHE={
+        'ENABLED': True, 'CACHE': 'default', 'TIMEOUT': 60,
+    })
+    def test_cache_miss_reads_primary(self):
+        """Страница для кэша собирается из основной базы, не с реплики."""
+        cache.clear()
+        self.assertEqual(self.get(cached_titles_view), 'primary')
+        self.assertEqual(self.get(cached_titles_view), 'primary')
+
+    @override_settings(POSTS_PAGE_CACHE={'ENABLED': False})
+    def test_uncached_page_reads_replica(self):
+        self.assertIn(
+            self.get(cached_titles_view), ('replica_a', 'replica_b')
+        )
@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from core.template_cache import (check_templates_compile, template_changed,
+                                 warm_templates)
+
+
+def cached_loader():
+    return engines['django'].engine.template_loaders[0]
+
+
+class TemplateCacheTest(SimpleTestCase):
+    def test_warm_up_fills_cache(self):
+        cached_loader().reset()
+        count = warm_templates()
+        self.assertGreater(count, 0)
+        self.assertIn('base.html', cached_loader().get_template_cache)
+
+    def test_templates_compile(self):
+        self.assertEqual(check_templates_compile(None), [])
+
+    def test_template_change_resets_cache(self):
+        warm_templates()
+        handled = template_changed(
+            None, file_path=Path(settings.TEMPLATES_DIR) / 'base.html'
+        )
+        self.assertTrue(handled)
+        self.assertEqual(cached_loader().get_template_cache, {})
+        self.assertIsNone(
+            template_changed(None, file_path=Path(__file__))
+        )
+
+    def test_broken_template_fails_check(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        (Path(directory) / 'broken.html').write_text('{% if %}')
+        templates = [{**settings.TEMPLATES[0], 'DIRS': [directory]}]
+        with override_settings(TEMPLATES=templates):
+            errors = check_templates_compile(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Group, Post
+from .models import Comment, Follow, Group, Post
+from .search import get_search_backend
 
 
 @admin.register(Post)
@@ -11,5 +12,19 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return get_search_backend().search(queryset, search_term), False
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author',)
+    raw_id_fields = ('post',)
+    empty_value_display = '-пусто-'
+
 
 admin.site.register(Group)
+admin.site.register(Follow)
@@ -0,0 +1,105 @@
+import hashlib
+import threading
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from core.routers import primary_reads
+
+INDEX_SCOPE = 'index'
+GROUP_SCOPE = 'group:{slug}'
+PROFILE_SCOPE = 'profile:{username}'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def page_cache_stats():
+    """Счётчики попаданий и промахов кэша страниц в этом процессе."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _get_cache():
+    return caches[settings.POSTS_PAGE_CACHE['CACHE']]
+
+
+def _version_key(scope):
+    return f'posts:page-version:{scope}'
+
+
+def _scope_version(cache, scope):
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Версия могла вытесниться из кэша: новая случайная версия
+        # гарантирует, что старые страницы уже не найдутся.
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_feed_pages(*scopes):
+    """Сбрасывает все закэшированные страницы указанных лент."""
+    if not settings.POSTS_PAGE_CACHE['ENABLED']:
+        return
+    cache = _get_cache()
+    cache.set_many(
+        {_version_key(scope): uuid.uuid4().hex for scope in scopes}, None
+    )
+
+
+def cache_feed_page(scope, public=False):
+    """Кэширует страницу ленты для анонимных пользователей.
+
+    scope — шаблон имени ленты, подставляются аргументы из URL,
+    например 'group:{slug}'. Ключ страницы строится из версии ленты
+    и полного пути запроса, включая номер страницы или курсор.
+    С public=True ответ одинаков для всех и кэшируется без проверки
+    пользователя, то есть без чтения сессии. Промах читает из основной
+    базы: сразу после сброса кэша реплика ещё может отставать.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            config = settings.POSTS_PAGE_CACHE
+            if (
+                not config['ENABLED']
+                or request.method != 'GET'
+                or not public and request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            cache = _get_cache()
+            scope_name = scope.format(**kwargs)
+            path_hash = hashlib.md5(
+                request.get_full_path().encode()
+            ).hexdigest()
+            key = (
+                f'posts:page:{scope_name}:'
+                f'{_scope_version(cache, scope_name)}:{path_hash}'
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                _count('hits')
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+            _count('misses')
+            with primary_reads():
+                response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(
+                    key,
+                    (response.content, response['Content-Type']),
+                    config['TIMEOUT'],
+                )
+            return response
+        return wrapper
+    return decorator
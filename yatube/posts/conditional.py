@@ -0,0 +1,82 @@
+import hashlib
+
+from django.db.models import Exists, F, OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from .models import Follow, Group, Post, User
+
+
+def _last_modified(**filters):
+    # ORDER BY modified DESC LIMIT 1 по индексу — один поиск, а не
+    # перебор всех постов ленты.
+    return Subquery(
+        Post.objects.filter(**filters).order_by('-modified')
+        .values('modified')[:1]
+    )
+
+
+def group_state(request, slug):
+    return Group.objects.filter(slug=slug).values(
+        'pk', 'title', 'description', 'posts_count',
+        last_modified=_last_modified(group=OuterRef('pk')),
+    ).first()
+
+
+def profile_state(request, username):
+    return User.objects.filter(username=username).values(
+        'pk', 'username', 'stats__posts_count',
+        last_modified=_last_modified(author=OuterRef('pk')),
+        is_followed=Exists(Follow.objects.filter(
+            user_id=request.user.pk, author=OuterRef('pk')
+        )),
+    ).first()
+
+
+def post_state(request, post_id):
+    return Post.objects.filter(pk=post_id).values(
+        'author__username', 'author__stats__posts_count',
+        'group__title', 'group__slug', 'comments_count',
+        last_modified=F('modified'),
+    ).first()
+
+
+def page_state(request):
+    """Состояние страницы, уже прочитанное conditional_page."""
+    return request._page_state
+
+
+def conditional_page(state_func, per_user=True):
+    """Отвечает 304, если страница не менялась, не вызывая view.
+
+    state_func получает запрос и аргументы из URL и одним запросом
+    к базе возвращает словарь с last_modified и всем, что ещё видно
+    на странице (или None, если объекта нет). ETag учитывает и
+    пользователя: шапка и кнопки у всех разные; per_user=False — для
+    ответов, одинаковых для всех, тогда сессия не читается. Для
+    вошедшего пользователя в ETag входит и CSRF-секрет: вход его
+    меняет, и форма из закешированной страницы получила бы 403.
+    Посчитанный ETag лежит в request.page_etag.
+
+    Last-Modified не отдаётся: удаление поста, переименование группы
+    или новый комментарий не сдвигают дату последней правки, и клиент
+    с одним If-Modified-Since получал бы устаревший 304. Дата правки
+    входит в ETag наравне со счётчиками.
+    """
+    def get_state(request, *args, **kwargs):
+        if not hasattr(request, '_page_state'):
+            request._page_state = state_func(request, *args, **kwargs)
+        return request._page_state
+
+    def etag(request, *args, **kwargs):
+        state = get_state(request, *args, **kwargs)
+        if state is None:
+            return None
+        user_key = None
+        if per_user and request.user.is_authenticated:
+            user_key = (request.user.pk, request.META.get('CSRF_COOKIE'))
+        request.page_etag = hashlib.md5(
+            repr((sorted(state.items()), user_key)).encode()
+        ).hexdigest()
+        return request.page_etag
+
+    return condition(etag_func=etag)
@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Group, Post, UserStats
+
+User = get_user_model()
+
+
+def shift_author_count(user_id, delta):
+    updated = UserStats.objects.filter(
+        user_id=user_id, posts_count__gte=-delta
+    ).update(posts_count=F('posts_count') + delta)
+    if not updated and delta > 0:
+        # Строки ещё нет: считаем один раз, дальше только сдвигаем.
+        UserStats.objects.update_or_create(
+            user_id=user_id,
+            defaults={
+                'posts_count': Post.objects.filter(author_id=user_id).count()
+            },
+        )
+
+
+def shift_group_count(group_id, delta):
+    if group_id is None:
+        return
+    Group.objects.filter(
+        pk=group_id, posts_count__gte=-delta
+    ).update(posts_count=F('posts_count') + delta)
+
+
+def shift_comment_count(post_id, delta):
+    # Число комментариев видно на карточке во всех лентах поста: новая
+    # дата правки меняет ETag страниц группы и профиля.
+    Post.objects.filter(
+        pk=post_id, comments_count__gte=-delta
+    ).update(
+        comments_count=F('comments_count') + delta,
+        modified=timezone.now(),
+    )
+
+
+def recount_comments():
+    """Пересчитывает счётчики комментариев одним UPDATE."""
+    counts = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(count=Count('pk')).values('count')
+    return Post.objects.update(
+        comments_count=Coalesce(Subquery(counts), Value(0))
+    )
+
+
+def recount_posts_of(author_ids, group_ids, batch_size=1000):
+    """Пересчитывает счётчики только указанных авторов и групп."""
+    author_ids = list(author_ids)
+    group_ids = list(group_ids)
+    group_counts = Post.objects.filter(group=OuterRef('pk')).order_by().values(
+        'group'
+    ).annotate(count=Count('pk')).values('count')
+    with transaction.atomic():
+        for start in range(0, len(author_ids), batch_size):
+            batch = author_ids[start:start + batch_size]
+            counts = dict(
+                Post.objects.order_by().filter(author_id__in=batch)
+                .values_list('author').annotate(Count('pk'))
+            )
+            UserStats.objects.filter(user_id__in=batch).delete()
+            UserStats.objects.bulk_create(
+                UserStats(user_id=pk, posts_count=counts.get(pk, 0))
+                for pk in batch
+            )
+        for start in range(0, len(group_ids), batch_size):
+            Group.objects.filter(
+                pk__in=group_ids[start:start + batch_size]
+            ).update(
+                posts_count=Coalesce(Subquery(group_counts), Value(0))
+            )
+
+
+def recount_posts(batch_size=1000):
+    """Пересчитывает все счётчики постов с нуля."""
+    posts = Post.objects.order_by()
+    author_counts = dict(
+        posts.values_list('author').annotate(Count('pk'))
+    )
+    group_counts = dict(
+        posts.filter(group__isnull=False)
+        .values_list('group').annotate(Count('pk'))
+    )
+    with transaction.atomic():
+        UserStats.objects.all().delete()
+        batch = []
+        for user_id in User.objects.values_list('pk', flat=True).iterator():
+            batch.append(UserStats(
+                user_id=user_id, posts_count=author_counts.get(user_id, 0)
+            ))
+            if len(batch) >= batch_size:
+                UserStats.objects.bulk_create(batch)
+                batch = []
+        UserStats.objects.bulk_create(batch)
+        Group.objects.update(posts_count=0)
+        for group_id, count in group_counts.items():
+            Group.objects.filter(pk=group_id).update(posts_count=count)
+    return len(author_counts), len(group_counts)
@@ -0,0 +1,214 @@
+"""RSS, Atom и JSON Feed для сайта, групп и авторов."""
+import json
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import caches
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import (Atom1Feed, Rss201rev2Feed,
+                                        SyndicationFeed)
+
+from core.routers import read_from_replica
+
+from .conditional import conditional_page
+from .models import Group, Post, User
+
+
+class JSONFeed(SyndicationFeed):
+    """JSON Feed 1.1 (https://jsonfeed.org/version/1.1)."""
+
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def write(self, outfile, encoding):
+        feed = self.feed
+        json.dump({
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': feed['title'],
+            'home_page_url': feed['link'],
+            'feed_url': feed['feed_url'],
+            'description': feed['description'],
+            'items': [
+                {
+                    'id': item['unique_id'] or item['link'],
+                    'url': item['link'],
+                    'title': item['title'],
+                    'content_html': item['description'],
+                    'date_published': item['pubdate'].isoformat(),
+                    'date_modified': item['updateddate'].isoformat(),
+                    'authors': [{'name': item['author_name']}],
+                }
+                for item in self.items
+            ],
+        }, outfile, ensure_ascii=False)
+
+
+FEED_TYPES = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+    'json': JSONFeed,
+}
+
+
+def recent_posts(posts):
+    return posts.order_by('-pub_date', '-pk')[
+        :settings.POSTS_SYNDICATION['LENGTH']
+    ]
+
+
+def _feed_state(posts, format, **scope):
+    """Всё, от чего зависит содержимое ленты: id, даты правки и авторы
+    последних постов. Один короткий запрос по индексу ленты."""
+    recent = tuple(recent_posts(posts).values_list(
+        'pk', 'modified', 'author__username'
+    ))
+    return {
+        **scope,
+        'format': format,
+        'posts': recent,
+        'last_modified': max(
+            (modified for _, modified, _ in recent), default=None
+        ),
+    }
+
+
+def site_feed_state(request, format):
+    return _feed_state(Post.objects.all(), format)
+
+
+def group_feed_state(request, format, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'pk', 'title', 'description'
+    ).first()
+    if group is None:
+        return None
+    return _feed_state(
+        Post.objects.filter(group_id=group['pk']), format, group=group
+    )
+
+
+def author_feed_state(request, format, username):
+    author = User.objects.filter(username=username).values(
+        'pk', 'first_name', 'last_name'
+    ).first()
+    if author is None:
+        return None
+    return _feed_state(
+        Post.objects.filter(author_id=author['pk']), format, author=author
+    )
+
+
+class PostsFeed(Feed):
+    """Последние посты; превью и даты уже лежат в строке поста."""
+
+    def items(self, obj):
+        return recent_posts(self.posts(obj).select_related('author').only(
+            'pub_date', 'modified', 'excerpt', 'preview_html',
+            'author__username',
+        ))
+
+    def item_title(self, post):
+        return post.excerpt
+
+    def item_description(self, post):
+        return post.preview_html
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_updateddate(self, post):
+        return post.modified
+
+    def item_author_name(self, post):
+        return post.author.username
+
+
+class SiteFeed(PostsFeed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def posts(self, group):
+        return group.posts.all()
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: записи {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Новые записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def posts(self, author):
+        return author.posts.all()
+
+
+def syndication_view(feed_class, state_func):
+    """View ленты во всех форматах.
+
+    Готовый XML/JSON хранится в кэше под ETag, поэтому лента строится
+    заново, только когда в ней поменялся хотя бы один пост, а клиент
+    с актуальной копией получает 304 без генерации вовсе.
+    """
+    feeds = {}
+    for name, feed_type in FEED_TYPES.items():
+        feeds[name] = feed_class()
+        feeds[name].feed_type = feed_type
+
+    @read_from_replica
+    @conditional_page(state_func, per_user=False)
+    def view(request, format, **kwargs):
+        if format not in feeds:
+            raise Http404
+        etag = getattr(request, 'page_etag', None)
+        if etag is None:
+            # Группы или автора нет: 404 отдаст сама лента.
+            return feeds[format](request, **kwargs)
+        config = settings.POSTS_SYNDICATION
+        cache = caches[config['CACHE']]
+        key = f'posts:syndication:{request.path}:{etag}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = feeds[format](request, **kwargs)
+        cache.set(
+            key, (response.content, response['Content-Type']),
+            config['TIMEOUT'],
+        )
+        return response
+    return view
+
+
+site_feed = syndication_view(SiteFeed, site_feed_state)
+group_feed = syndication_view(GroupFeed, group_feed_state)
+author_feed = syndication_view(AuthorFeed, author_feed_state)
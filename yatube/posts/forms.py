@@ -1,10 +1,64 @@
+from io import BytesIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.forms import ModelForm
+from PIL import Image, ImageOps
 
-from .models import Post
+from .models import Comment, Post
 
 User = get_user_model()
 
+# Качество JPEG, когда исходных таблиц нет: у MPO и у повёрнутой
+# картинки.
+JPEG_QUALITY = 90
+EXIF_ORIENTATION = 0x0112
+
+
+def strip_image_metadata(uploaded):
+    """Пересохраняет картинку без EXIF и прочих метаданных.
+
+    Картинка декодируется один раз и только если в ней есть EXIF.
+    Поворот из EXIF применяется к пикселям, цветовой профиль ICC
+    сохраняется. Для JPEG без поворота сохраняются исходные таблицы
+    квантования. MPO (так Pillow видит снимки многих телефонов) всегда
+    сохраняется обычным JPEG из первого кадра.
+    """
+    uploaded.seek(0)
+    image = Image.open(uploaded)
+    is_mpo = image.format == 'MPO'
+    if not is_mpo and (
+        'exif' not in image.info or getattr(image, 'is_animated', False)
+    ):
+        # Метаданных нет (или это анимация) — файл не пересобираем.
+        uploaded.seek(0)
+        return uploaded
+    image_format = 'JPEG' if is_mpo else image.format
+    image.load()
+    options = {}
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    if image.getexif().get(EXIF_ORIENTATION, 1) != 1:
+        # Без EXIF снимок с телефона иначе лёг бы набок.
+        image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG':
+        # 'keep' работает, только пока пиксели не менялись.
+        options['quality'] = (
+            'keep' if image.format == 'JPEG' else JPEG_QUALITY
+        )
+    # Копия в памяти (файл не больше MAX_SIZE): временный файл после
+    # переноса в хранилище некому было бы закрыть.
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    size = buffer.tell()
+    buffer.seek(0)
+    content_type = 'image/jpeg' if is_mpo else uploaded.content_type
+    return InMemoryUploadedFile(
+        buffer, 'image', uploaded.name, content_type, size, None
+    )
+
 
 class PostForm(ModelForm):
     class Meta:
@@ -18,3 +72,29 @@ class PostForm(ModelForm):
             'text': 'Введите текст записи',
             'group': 'Выберите группу',
         }
+
+    def __init__(self, *args, rejected_uploads=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rejected_uploads = rejected_uploads or {}
+
+    def clean_image(self):
+        if 'image' in self.rejected_uploads:
+            raise ValidationError(self.rejected_uploads['image'])
+        image = self.cleaned_data.get('image')
+        if not image or 'image' not in self.files:
+            return image
+        config = settings.POSTS_IMAGE_UPLOAD
+        if image.size > config['MAX_SIZE']:
+            raise ValidationError('Файл слишком большой.')
+        width, height = image.image.size
+        if width * height > config['MAX_PIXELS']:
+            raise ValidationError('Слишком большое изображение.')
+        if image.image.format not in config['FORMATS']:
+            raise ValidationError('Неподдерживаемый формат изображения.')
+        return strip_image_metadata(image)
+
+
+class CommentForm(ModelForm):
+    class Meta:
+        model = Comment
+        fields = ('text',)
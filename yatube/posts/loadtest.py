@@ -0,0 +1,232 @@
+"""Нагрузочный прогон: заполнение базы и замер страниц через WSGI."""
+import math
+import random
+import subprocess
+import threading
+import time
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+
+from .models import Group, Post, User
+from .transfer import refresh_derived_data
+
+SEED_PREFIX = 'loadtest'
+TEXT_POOL = 500
+ENDPOINTS = (
+    'posts:index', 'posts:group_list', 'posts:profile',
+    'posts:post_detail', 'posts:post_create', 'posts:post_edit',
+)
+
+
+def seed_site(users, groups, posts, batch_size=5000, seed=0):
+    """Добивает базу до заданного объёма детерминированными данными.
+
+    Повторный запуск с теми же числами ничего не создаёт, поэтому
+    одна и та же база годится для прогонов на разных коммитах.
+    """
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    password = make_password(None)
+    existing = User.objects.filter(username__startswith=SEED_PREFIX).count()
+    User.objects.bulk_create(
+        (
+            User(
+                username=f'{SEED_PREFIX}{i}',
+                first_name=fake.first_name(),
+                last_name=fake.last_name(),
+                password=password,
+            )
+            for i in range(existing, users)
+        ),
+        batch_size=batch_size,
+    )
+    existing = Group.objects.filter(slug__startswith=SEED_PREFIX).count()
+    Group.objects.bulk_create(
+        Group(
+            title=fake.catch_phrase()[:200],
+            slug=f'{SEED_PREFIX}-{i}',
+            description=fake.paragraph(),
+        )
+        for i in range(existing, groups)
+    )
+    author_ids = list(
+        User.objects.filter(username__startswith=SEED_PREFIX)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    group_ids = list(
+        Group.objects.filter(slug__startswith=SEED_PREFIX)
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    texts = [fake.paragraph(nb_sentences=5) for _ in range(TEXT_POOL)]
+    existing = Post.objects.filter(author_id__in=author_ids).count()
+    batch = []
+    for _ in range(existing, posts):
+        post = Post(
+            text=rng.choice(texts),
+            author_id=rng.choice(author_ids),
+            # Примерно каждый пятый пост без группы.
+            group_id=rng.choice(group_ids) if rng.random() > 0.2 else None,
+        )
+        post.render_text()
+        batch.append(post)
+        if len(batch) >= batch_size:
+            Post.objects.bulk_create(batch)
+            batch = []
+    Post.objects.bulk_create(batch)
+    refresh_derived_data(batch_size)
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+    }
+
+
+class Scenario:
+    """Выбирает адреса для запросов одного потока."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.group_slugs = list(
+            Group.objects.filter(posts_count__gt=0)
+            .values_list('slug', flat=True)[:100]
+        )
+        self.usernames = list(
+            User.objects.filter(stats__posts_count__gt=0)
+            .values_list('username', flat=True)[:100]
+        )
+        self.post_ids = list(
+            Post.objects.order_by('-pk').values_list('pk', flat=True)[:1000]
+        )
+        self.author = User.objects.get(username=self.rng.choice(
+            self.usernames
+        ))
+        self.own_post_id = (
+            self.author.posts.order_by('-pk').values_list('pk', flat=True)
+            .first()
+        )
+
+    def request(self, name):
+        """Метод, адрес, данные и нужна ли авторизация."""
+        rng = self.rng
+        if name == 'posts:index':
+            return 'get', reverse(name), None, False
+        if name == 'posts:group_list':
+            slug = rng.choice(self.group_slugs)
+            return 'get', reverse(name, args=[slug]), None, False
+        if name == 'posts:profile':
+            username = rng.choice(self.usernames)
+            return 'get', reverse(name, args=[username]), None, False
+        if name == 'posts:post_detail':
+            post_id = rng.choice(self.post_ids)
+            return 'get', reverse(name, args=[post_id]), None, False
+        data = {'text': f'Пост нагрузочного прогона {rng.random()}'}
+        if name == 'posts:post_create':
+            return 'post', reverse(name), data, True
+        return 'post', reverse(name, args=[self.own_post_id]), data, True
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(math.ceil(fraction * len(values)), 1) - 1]
+
+
+def worker(number, endpoints, requests, warmup, seed, results):
+    scenario = Scenario(seed + number)
+    anonymous = Client()
+    authorized = Client()
+    authorized.force_login(scenario.author)
+    try:
+        for iteration in range(warmup + requests):
+            for name in endpoints:
+                method, url, data, login = scenario.request(name)
+                client = authorized if login else anonymous
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = getattr(client, method)(url, data)
+                    elapsed = time.perf_counter() - start
+                if iteration < warmup:
+                    continue
+                results[name].append(
+                    (elapsed, len(queries), response.status_code)
+                )
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_load(endpoints=ENDPOINTS, requests=100, concurrency=4, warmup=5,
+             seed=0):
+    """Гоняет страницы параллельными клиентами и собирает отчёт.
+
+    Каждый поток делает warmup + requests проходов по всем
+    endpoints; прогрев в отчёт не попадает.
+    """
+    results = {name: [] for name in endpoints}
+    args = (endpoints, requests, warmup, seed, results)
+    start = time.perf_counter()
+    if concurrency == 1:
+        worker(0, *args)
+    else:
+        threads = [
+            threading.Thread(target=worker, args=(number, *args))
+            for number in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    wall = time.perf_counter() - start
+    report = {}
+    for name in endpoints:
+        timings = [elapsed * 1000 for elapsed, _, _ in results[name]]
+        queries = [count for _, count, _ in results[name]]
+        report[name] = {
+            'requests': len(timings),
+            'errors': sum(
+                status >= 400 for _, _, status in results[name]
+            ),
+            'throughput_rps': len(timings) / wall,
+            'mean_ms': sum(timings) / len(timings) if timings else None,
+            'p50_ms': percentile(timings, 0.5),
+            'p95_ms': percentile(timings, 0.95),
+            'p99_ms': percentile(timings, 0.99),
+            'queries_per_request': (
+                sum(queries) / len(queries) if queries else None
+            ),
+        }
+    return {
+        'commit': current_commit(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'dataset': {
+            'users': User.objects.count(),
+            'groups': Group.objects.count(),
+            'posts': Post.objects.count(),
+        },
+        'concurrency': concurrency,
+        'requests_per_thread': requests,
+        'seed': seed,
+        'wall_seconds': wall,
+        'throughput_rps': sum(len(r) for r in results.values()) / wall,
+        'endpoints': report,
+    }
@@ -0,0 +1,108 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.utils import KEYSET_ORDERING
+
+User = get_user_model()
+
+SEED_PREFIX = 'bench'
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает план запроса и задержку каждой ленты постов. '
+        'Чтобы сравнить «до» и «после» индексов, запустите команду '
+        'после `migrate posts 0008` и после `migrate posts`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Сколько постов создать перед замером',
+        )
+        parser.add_argument('--authors', type=int, default=10)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(
+                options['seed'], options['authors'],
+                options['groups'], options['batch_size'],
+            )
+        author = User.objects.filter(posts__isnull=False).first()
+        group = Group.objects.filter(posts__isnull=False).first()
+        if author is None or group is None:
+            self.stderr.write('Нет постов с группой: запустите с --seed N')
+            return
+        feeds = {
+            'posts:index': (
+                Post.objects.feed().order_by(*KEYSET_ORDERING),
+                reverse('posts:index'),
+            ),
+            'posts:group_list': (
+                group.posts.feed().order_by(*KEYSET_ORDERING),
+                reverse('posts:group_list', kwargs={'slug': group.slug}),
+            ),
+            'posts:profile': (
+                author.posts.feed().order_by(*KEYSET_ORDERING),
+                reverse(
+                    'posts:profile', kwargs={'username': author.username}
+                ),
+            ),
+        }
+        client = Client()
+        for name, (queryset, url) in feeds.items():
+            plan = queryset[:11].explain()
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(plan)
+            if 'TEMP B-TREE' in plan.upper():
+                self.stdout.write(self.style.WARNING(
+                    'сортировка без индекса'
+                ))
+            self.stdout.write(
+                f'медиана {statistics.median(timings):.2f} мс, '
+                f'максимум {max(timings):.2f} мс'
+            )
+
+    def seed(self, total, authors_count, groups_count, batch_size):
+        authors = [
+            User.objects.get_or_create(username=f'{SEED_PREFIX}{i}')[0]
+            for i in range(authors_count)
+        ]
+        groups = [
+            Group.objects.get_or_create(
+                slug=f'{SEED_PREFIX}-{i}',
+                defaults={
+                    'title': f'Группа {i}',
+                    'description': 'Группа для замеров',
+                },
+            )[0]
+            for i in range(groups_count)
+        ]
+        batch = []
+        for i in range(total):
+            post = Post(
+                text=f'Пост для замеров {i}',
+                author=authors[i % len(authors)],
+                group=groups[i % len(groups)],
+            )
+            post.render_text()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                Post.objects.bulk_create(batch)
+                batch = []
+        Post.objects.bulk_create(batch)
+        self.stdout.write(f'Создано постов: {total}')
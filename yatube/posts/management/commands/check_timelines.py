@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.timeline import all_feeds, check_timeline
+
+
+class Command(BaseCommand):
+    help = 'Сверяет предвычисленные ленты постов с базой'
+
+    def handle(self, *args, **options):
+        broken = [feed for feed in all_feeds() if not check_timeline(feed)]
+        if broken:
+            raise CommandError(
+                'Ленты расходятся с базой: ' + ', '.join(broken)
+                + '. Запустите rebuild_timelines.'
+            )
+        self.stdout.write(self.style.SUCCESS('Все ленты совпадают с базой'))
@@ -0,0 +1,44 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import FORMATS, export_rows, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Выгружает все посты в JSONL или CSV, не держа их в памяти'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdout')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        rows = CountingRows(export_rows(options['chunk_size']))
+        start = time.perf_counter()
+        if path == '-':
+            write_rows(sys.stdout, file_format, rows)
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            write_rows(stream, file_format, rows)
+        elapsed = time.perf_counter() - start
+        rate = rows.count / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено постов: {rows.count}, {rate:.0f} строк/с'
+        ))
+
+
+class CountingRows:
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
@@ -0,0 +1,59 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import FORMATS, PostImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из JSONL или CSV (поля author, group, text, '
+        'pub_date, image) пачками через bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdin')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--transaction-size', type=int, default=10000,
+            help='Сколько строк вставлять в одной транзакции',
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать неизвестных авторов вместо пропуска строк',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        importer = PostImporter(
+            batch_size=options['batch_size'],
+            transaction_size=options['transaction_size'],
+            create_authors=options['create_authors'],
+        )
+        start = time.perf_counter()
+        try:
+            if path == '-':
+                importer.run(read_rows(sys.stdin, file_format))
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    importer.run(read_rows(stream, file_format))
+        except (KeyError, ValueError) as error:
+            raise CommandError(
+                f'Ошибка в строке после {importer.imported} '
+                f'импортированных: {error!r}'
+            )
+        finally:
+            # Уже закоммиченные пачки остаются в базе и при ошибке в
+            # следующих строках: им тоже нужны счётчики, ленты и индекс.
+            importer.finish()
+        elapsed = time.perf_counter() - start
+        rate = importer.imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {importer.imported}, '
+            f'пропущено: {importer.skipped}, {rate:.0f} строк/с'
+        ))
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from posts.loadtest import ENDPOINTS, run_load, seed_site
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон страниц постов: задержки p50/p95/p99, '
+        'пропускная способность и число SQL-запросов, отчёт в JSON. '
+        'Для сравнения коммитов гоняйте на одной базе с одним --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fill', action='store_true',
+            help='Сначала добить базу до --users/--groups/--posts',
+        )
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--endpoint', action='append', choices=ENDPOINTS,
+            help='Какие страницы гонять (по умолчанию все)',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Проходов по страницам на поток',
+        )
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для JSON-отчёта')
+
+    def handle(self, *args, **options):
+        if options['fill']:
+            dataset = seed_site(
+                options['users'], options['groups'], options['posts'],
+                options['batch_size'], options['seed'],
+            )
+            self.stderr.write(f'Данные: {dataset}')
+        report = run_load(
+            endpoints=options['endpoint'] or ENDPOINTS,
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+            seed=options['seed'],
+        )
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
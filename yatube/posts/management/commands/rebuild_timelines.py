@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import all_feeds, rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает предвычисленные ленты постов из базы'
+
+    def handle(self, *args, **options):
+        count = 0
+        for feed in all_feeds():
+            rebuild_timeline(feed)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Пересобрано лент: {count}'))
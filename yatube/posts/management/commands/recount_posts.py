@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_comments, recount_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики постов у авторов и групп '
+        'и счётчики комментариев у постов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        authors, groups = recount_posts(batch_size=options['batch_size'])
+        posts = recount_comments()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано: авторов с постами {authors}, групп {groups}, '
+            f'постов {posts}'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.rendering import rerender_posts
+
+
+class Command(BaseCommand):
+    help = 'Заново строит сохранённый HTML и начало текста постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--only-missing', action='store_true',
+            help='Только посты, у которых HTML ещё не построен',
+        )
+
+    def handle(self, *args, **options):
+        updated = rerender_posts(
+            Post, options['batch_size'], options['only_missing']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Обновлено постов: {updated}'))
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def fill_post_counters(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    posts = Post.objects.order_by()
+    for author_id, count in posts.values_list('author').annotate(
+        Count('pk')
+    ):
+        UserStats.objects.update_or_create(
+            user_id=author_id, defaults={'posts_count': count}
+        )
+    for group_id, count in posts.filter(group__isnull=False).values_list(
+        'group'
+    ).annotate(Count('pk')):
+        Group.objects.filter(pk=group_id).update(posts_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_auto_20261018_1802'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_post_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:23
+
+from django.db import migrations, models
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+
+def render_post_previews(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.order_by('pk').only('pk', 'text')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            return
+        for post in batch:
+            post.preview_html = linebreaks(
+                Truncator(post.text).chars(300), autoescape=True
+            )
+        Post.objects.bulk_update(batch, ['preview_html'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_text_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='preview_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Превью в HTML'),
+        ),
+        migrations.RunPython(
+            render_post_previews, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations
+
+DATABASE_BACKEND = 'posts.timeline.DatabaseTimelineBackend'
+
+
+def fill_timelines(apps, schema_editor):
+    """Собирает ленты в TimelineEntry для уже существующих постов.
+
+    Без этого после выкладки ленты читались бы из posts_post, пока не
+    наберутся новые посты. С CacheTimelineBackend ленты живут в кэше —
+    их собирает команда rebuild_timelines.
+    """
+    if settings.POSTS_TIMELINE['BACKEND'] != DATABASE_BACKEND:
+        return
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    length = settings.POSTS_TIMELINE['LENGTH']
+    posts = Post.objects.order_by('-pub_date', '-pk')
+    feeds = [('index', posts)] + [
+        (f'group:{group_id}', posts.filter(group_id=group_id))
+        for group_id in Group.objects.values_list('pk', flat=True)
+    ]
+    TimelineEntry.objects.all().delete()
+    for feed, feed_posts in feeds:
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(feed=feed, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in feed_posts.values_list(
+                    'pk', 'pub_date'
+                )[:length]
+            ),
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_comment'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
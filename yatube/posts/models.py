@@ -1,24 +1,76 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .rendering import (EXCERPT_LENGTH, RENDERED_FIELDS, make_excerpt,
+                        render_preview, render_text)
+
 User = get_user_model()
 
 
-class Group(models.Model):
+class LoadedValuesMixin:
+    """Запоминает значения полей, прочитанные из базы.
+
+    По ним обработчики сигналов понимают, что именно поменялось
+    при сохранении: автор, группа или slug.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class Group(LoadedValuesMixin, models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, verbose_name="address")
     description = models.TextField(help_text="Описание группы")
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False,
+    )
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа приходят одним запросом.
+
+        Грузятся только поля карточки: вместо полного текста — готовое
+        превью, полный текст читается только на странице поста.
+        """
+        return self.select_related('author', 'group').only(
+            'pub_date', 'modified', 'preview_html', 'comments_count',
+            'author__username', 'group__slug', 'group__title',
+        )
+
+
+class Post(LoadedValuesMixin, models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Введите текст поста'
     )
+    text_html = models.TextField(
+        'Текст в HTML',
+        blank=True,
+        editable=False,
+    )
+    excerpt = models.CharField(
+        'Начало текста',
+        max_length=EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+    )
+    preview_html = models.TextField(
+        'Превью в HTML',
+        blank=True,
+        editable=False,
+    )
     pub_date = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -39,10 +91,165 @@ class Post(models.Model):
         blank=True
     )
 
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_feed_idx',
+            ),
+            models.Index(
+                fields=['author', '-modified'],
+                name='post_author_modified_idx',
+            ),
+            models.Index(
+                fields=['group', '-modified'],
+                name='post_group_modified_idx',
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:15]
+
+    def render_text(self):
+        """Обновляет сохранённый HTML; bulk_create его не вызывает."""
+        self.text_html = render_text(self.text)
+        self.excerpt = make_excerpt(self.text)
+        self.preview_html = render_preview(self.text)
+
+    def save(self, *args, **kwargs):
+        self.render_text()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *RENDERED_FIELDS}
+        super().save(*args, **kwargs)
+
+
+class Comment(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Автор',
+    )
+    text = models.TextField(
+        verbose_name='Текст комментария',
+        help_text='Введите текст комментария'
+    )
+    created = models.DateTimeField('Дата комментария', auto_now_add=True)
+
+    class Meta:
+        ordering = ['created', 'id']
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_idx',
+            ),
+        ]
+        verbose_name = 'Комментарий'
+        verbose_name_plural = 'Комментарии'
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class Follow(models.Model):
+    """Подписка пользователя user на автора author."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        # Уникальный индекс (user, author) обслуживает и ленту подписок:
+        # подзапрос «авторы пользователя» читается из него целиком.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow',
+            ),
+        ]
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+
+    def __str__(self):
+        return f'{self.user} → {self.author}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'{self.user}: {self.posts_count}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в предвычисленной ленте (общей или ленте группы)."""
+    feed = models.CharField('Лента', max_length=100)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['feed', 'post'], name='unique_timeline_post'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['feed', '-pub_date', '-post'],
+                name='timeline_feed_idx',
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
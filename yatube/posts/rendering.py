@@ -0,0 +1,47 @@
+"""HTML текста поста, который хранится рядом с самим текстом."""
+from django.db import transaction
+from django.db.models import Q
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+
+EXCERPT_LENGTH = 30
+PREVIEW_LENGTH = 300
+RENDERED_FIELDS = ('text_html', 'excerpt', 'preview_html')
+
+
+def render_text(text):
+    """То же, что фильтр linebreaks в шаблоне: экранирование и абзацы."""
+    return linebreaks(text, autoescape=True)
+
+
+def make_excerpt(text):
+    return Truncator(text).chars(EXCERPT_LENGTH)
+
+
+def render_preview(text):
+    """Начало поста для карточки в ленте, уже в HTML."""
+    return render_text(Truncator(text).chars(PREVIEW_LENGTH))
+
+
+def rerender_posts(model, batch_size=1000, only_missing=False):
+    """Пересчитывает сохранённый HTML пачками по первичному ключу.
+
+    Каждая пачка — отдельная транзакция с одним bulk_update, поэтому
+    проход по миллионам строк не держит блокировку и не ест память.
+    Возвращает число обновлённых постов.
+    """
+    posts = model.objects.order_by('pk').only('pk', 'text')
+    if only_missing:
+        posts = posts.filter(Q(text_html='') | Q(preview_html=''))
+    last_pk = 0
+    updated = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return updated
+        for post in batch:
+            post.render_text()
+        with transaction.atomic():
+            model.objects.bulk_update(batch, RENDERED_FIELDS)
+        last_pk = batch[-1].pk
+        updated += len(batch)
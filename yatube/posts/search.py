@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+
+class BaseSearchBackend:
+    """Поиск по тексту постов.
+
+    search() принимает queryset постов и возвращает его же,
+    отфильтрованный по запросу и упорядоченный по релевантности.
+    """
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_posts(self, posts):
+        """Индексирует queryset постов, например вставленных bulk_create."""
+        for post in posts.only('text').iterator():
+            self.index_post(post)
+
+    def rebuild(self):
+        """Переиндексирует все посты, например после bulk_create."""
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Запасной вариант без индекса: LIKE по тексту."""
+
+    def search(self, queryset, query):
+        for term in query.split():
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Инвертированный индекс на SQLite FTS5.
+
+    Таблица posts_post_fts создаётся миграцией, rowid в ней равен id
+    поста. Ранжирование — встроенный bm25 (колонка rank).
+    """
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def index_posts(self, posts):
+        # Один INSERT ... SELECT вместо запроса на каждый пост.
+        sql, params = posts.order_by().values_list(
+            'pk', 'text'
+        ).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+                f'(SELECT id FROM ({sql}))',
+                params,
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) {sql}', params
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+
+    def search(self, queryset, query):
+        # Каждое слово — отдельная фраза в кавычках, чтобы символы
+        # пользователя не трактовались как синтаксис FTS5.
+        terms = ' '.join(
+            '"{}"'.format(term.replace('"', '""')) for term in query.split()
+        )
+        post_table = Post._meta.db_table
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[
+                f'{FTS_TABLE}.rowid = {post_table}.id',
+                f'{FTS_TABLE} MATCH %s',
+            ],
+            params=[terms],
+            select={'rank': f'{FTS_TABLE}.rank'},
+            order_by=['rank'],
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Полнотекстовый поиск PostgreSQL (tsvector/tsquery).
+
+    Вектор строится выражением, поэтому для скорости достаточно
+    GIN-индекса по to_tsvector(config, text).
+    """
+
+    config = 'russian'
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+        vector = SearchVector('text', config=self.config)
+        search_query = SearchQuery(query, config=self.config)
+        return queryset.annotate(
+            search=vector, rank=SearchRank(vector, search_query)
+        ).filter(search=search_query).order_by('-rank')
+
+
+_backends = {}
+
+
+def get_search_backend():
+    path = settings.POSTS_SEARCH_BACKEND
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
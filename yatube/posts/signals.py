@@ -0,0 +1,173 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import (GROUP_SCOPE, INDEX_SCOPE, PROFILE_SCOPE,
+                    invalidate_feed_pages)
+from .counters import (shift_author_count, shift_comment_count,
+                       shift_group_count)
+from .models import Comment, Group, Post
+from .search import get_search_backend
+from .thumbnails import schedule_thumbnails
+from .timeline import (add_to_timelines, get_timeline_backend, group_feeds,
+                       post_feeds, remove_from_timelines)
+
+User = get_user_model()
+
+# id постов, которые сейчас удаляются в этом потоке (см. comment_deleted).
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, 'post_ids'):
+        _deleting.post_ids = set()
+    return _deleting.post_ids
+
+
+def invalidate_on_commit(*scopes):
+    """Сбрасывает кэш лент после коммита транзакции.
+
+    Сброс до коммита не помогает: запрос, пришедший между ними,
+    прочитает старые данные и закэширует их под новой версией.
+    """
+    if not settings.POSTS_PAGE_CACHE['ENABLED']:
+        return
+    transaction.on_commit(lambda: invalidate_feed_pages(*scopes))
+
+
+def invalidate_post_pages(author_ids, group_ids):
+    """Сбрасывает кэш ленты сайта и лент затронутых авторов и групп."""
+    if not settings.POSTS_PAGE_CACHE['ENABLED']:
+        return
+    usernames = User.objects.filter(
+        pk__in=author_ids
+    ).values_list('username', flat=True)
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk is not None]
+    ).values_list('slug', flat=True)
+    invalidate_on_commit(
+        INDEX_SCOPE,
+        *(PROFILE_SCOPE.format(username=name) for name in usernames),
+        *(GROUP_SCOPE.format(slug=slug) for slug in slugs),
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    if created:
+        shift_author_count(instance.author_id, 1)
+        shift_group_count(instance.group_id, 1)
+        add_to_timelines(instance, post_feeds(instance.group_id))
+        old_author_id = instance.author_id
+        old_group_id = instance.group_id
+    else:
+        old_author_id = loaded.get('author_id', instance.author_id)
+        if old_author_id != instance.author_id:
+            shift_author_count(old_author_id, -1)
+            shift_author_count(instance.author_id, 1)
+        old_group_id = loaded.get('group_id', instance.group_id)
+        if old_group_id != instance.group_id:
+            shift_group_count(old_group_id, -1)
+            shift_group_count(instance.group_id, 1)
+            remove_from_timelines(instance.pk, group_feeds(old_group_id))
+            add_to_timelines(instance, group_feeds(instance.group_id))
+    invalidate_post_pages(
+        {old_author_id, instance.author_id},
+        {old_group_id, instance.group_id},
+    )
+    if created or instance.text != loaded.get('text'):
+        get_search_backend().index_post(instance)
+    if instance.image and instance.image.name != loaded.get('image'):
+        schedule_thumbnails(instance.image.name)
+    loaded.update(
+        author_id=instance.author_id,
+        group_id=instance.group_id,
+        image=instance.image.name,
+        text=instance.text,
+    )
+    instance._loaded_values = loaded
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # pre_delete поста приходит раньше каскадного удаления комментариев.
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    deleting_posts().discard(instance.pk)
+    shift_author_count(instance.author_id, -1)
+    shift_group_count(instance.group_id, -1)
+    invalidate_post_pages({instance.author_id}, {instance.group_id})
+    get_search_backend().remove_post(instance.pk)
+    remove_from_timelines(instance.pk, post_feeds(instance.group_id))
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    scopes = [GROUP_SCOPE.format(slug=instance.slug)]
+    loaded = getattr(instance, '_loaded_values', {})
+    old_slug = loaded.get('slug', instance.slug)
+    if old_slug != instance.slug:
+        scopes.append(GROUP_SCOPE.format(slug=old_slug))
+    if (old_slug, loaded.get('title', instance.title)) != (
+        instance.slug, instance.title
+    ):
+        # Ссылки на группу есть в общей ленте и в профилях авторов:
+        # новая дата правки постов меняет ETag профилей и ключи карточек.
+        instance.posts.update(modified=timezone.now())
+        invalidate_post_pages(
+            set(instance.posts.values_list('author', flat=True)), ()
+        )
+    invalidate_on_commit(*scopes)
+    loaded.update(slug=instance.slug, title=instance.title)
+    instance._loaded_values = loaded
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # pre_delete: после удаления у постов уже не будет ссылки на группу.
+    invalidate_on_commit(GROUP_SCOPE.format(slug=instance.slug))
+    for feed in group_feeds(instance.pk):
+        get_timeline_backend().clear(feed)
+    invalidate_post_pages(
+        set(instance.posts.values_list('author', flat=True)), ()
+    )
+
+
+def invalidate_comment_pages(post_id):
+    # Число комментариев видно на карточке поста во всех его лентах.
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        invalidate_post_pages({post['author_id']}, {post['group_id']})
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    shift_comment_count(instance.post_id, 1)
+    invalidate_comment_pages(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in deleting_posts():
+        # Пост удаляется целиком: счётчик ему уже не нужен, а кэш лент
+        # сбросит post_deleted — один раз, а не на каждый комментарий.
+        return
+    shift_comment_count(instance.post_id, -1)
+    invalidate_comment_pages(instance.post_id)
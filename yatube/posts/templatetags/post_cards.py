@@ -0,0 +1,43 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+register = template.Library()
+
+
+def post_card_key(post, show_group_link):
+    # Счётчик комментариев, автор и группа меняются UPDATE без правки
+    # modified (переименование группы, SET_NULL при её удалении),
+    # поэтому всё, что видно на карточке, входит в ключ.
+    group = post.group
+    shown = repr((
+        post.author.username,
+        group and (group.slug, group.title),
+        post.comments_count,
+    ))
+    return (
+        f'posts:card:{post.pk}:{post.modified.timestamp()}:'
+        f'{hashlib.md5(shown.encode()).hexdigest()}:'
+        f'{int(show_group_link)}:{get_language()}'
+    )
+
+
+@register.simple_tag
+def post_card(post, show_group_link=True):
+    """Карточка поста для лент, HTML кэшируется до изменения поста."""
+    config = settings.POSTS_CARD_CACHE
+    context = {'post': post, 'show_group_link': show_group_link}
+    if not config['ENABLED']:
+        return render_to_string('includes/post_card.html', context)
+    cache = caches[config['CACHE']]
+    key = post_card_key(post, show_group_link)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('includes/post_card.html', context)
+        cache.set(key, str(html), config['TIMEOUT'])
+    return mark_safe(html)
@@ -0,0 +1,54 @@
+from django import template
+from django.conf import settings
+
+from ..thumbnails import (cached_thumbnail, check_size, image_variants,
+                          schedule_thumbnails)
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image_url(image, geometry, **options):
+    """URL готовой миниатюры, а пока её нет — URL оригинала.
+
+    Миниатюра никогда не считается в потоке запроса. Размер должен
+    быть заранее указан в POSTS_THUMBNAILS['SIZES'].
+    """
+    check_size(geometry, options)
+    if not image:
+        return ''
+    thumbnail = cached_thumbnail(image, geometry, **options)
+    if thumbnail is not None:
+        return thumbnail.url
+    if settings.POSTS_THUMBNAILS['ASYNC']:
+        schedule_thumbnails(image.name)
+    return image.url
+
+
+@register.inclusion_tag('includes/post_picture.html')
+def post_picture(image, geometry, sizes='100vw', **options):
+    """Разметка <picture> с srcset из уже готовых вариантов картинки."""
+    sources = {}
+    fallback = []
+    for image_format, width, variant_geometry, variant_options in (
+        image_variants(geometry, options)
+    ):
+        thumbnail = cached_thumbnail(image, variant_geometry,
+                                     **variant_options)
+        if thumbnail is None:
+            continue
+        candidate = f'{thumbnail.url} {width}w'
+        if image_format is None:
+            fallback.append(candidate)
+        else:
+            sources.setdefault(image_format, []).append(candidate)
+    return {
+        'src': post_image_url(image, geometry, **options),
+        'srcset': ', '.join(fallback),
+        'sources': [
+            {'type': f'image/{image_format.lower()}',
+             'srcset': ', '.join(candidates)}
+            for image_format, candidates in sources.items()
+        ],
+        'sizes': sizes,
+    }
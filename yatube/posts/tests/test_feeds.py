@@ -0,0 +1,103 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationFeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ElenaRomm')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый текст', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def feed_url(self, name, format, *args):
+        return reverse(f'posts:{name}', args=[*args, format])
+
+    def test_formats(self):
+        content_types = {
+            'rss': 'application/rss+xml',
+            'atom': 'application/atom+xml',
+            'json': 'application/feed+json',
+        }
+        for format, content_type in content_types.items():
+            for url in (
+                self.feed_url('site_feed', format),
+                self.feed_url('group_feed', format, self.group.slug),
+                self.feed_url('author_feed', format, self.user.username),
+            ):
+                with self.subTest(url=url):
+                    response = self.guest_client.get(url)
+                    self.assertTrue(
+                        response['Content-Type'].startswith(content_type)
+                    )
+                    self.assertContains(response, 'Тестовый текст')
+        data = json.loads(
+            self.guest_client.get(self.feed_url('site_feed', 'json')).content
+        )
+        self.assertEqual(data['items'][0]['title'], self.post.excerpt)
+
+    def test_unknown_scope_or_format(self):
+        for url in ('/feeds/xml/', '/feeds/group/missing/rss/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+    def test_unchanged_feed_is_not_regenerated(self):
+        url = self.feed_url('site_feed', 'atom')
+        etag = self.guest_client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_new_post_changes_only_its_scopes(self):
+        urls = {
+            name: self.feed_url(name, 'rss', *args)
+            for name, args in (
+                ('site_feed', ()),
+                ('group_feed', (self.group.slug,)),
+                ('author_feed', (self.user.username,)),
+            )
+        }
+        other_url = self.feed_url('group_feed', 'rss', self.other_group.slug)
+        etags = {
+            url: self.guest_client.get(url)['ETag']
+            for url in (*urls.values(), other_url)
+        }
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group
+        )
+        for url in urls.values():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertContains(response, 'Новый пост')
+        response = self.guest_client.get(
+            other_url, HTTP_IF_NONE_MATCH=etags[other_url]
+        )
+        self.assertEqual(response.status_code, 304)
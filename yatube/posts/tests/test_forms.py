@@ -1,8 +1,14 @@
+import shutil
+import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image, ImageCms
 
 from ..models import Group, Post
 
@@ -16,7 +22,7 @@ class PostCreateFormTests(TestCase):
         cls.user = User.objects.create(username='HASNoName')
         cls.group = Group.objects.create(
             title='Тестовая группа',
-            slug='Тестовый слаг',
+            slug='test-slug',
             description='Тестовое описание',
         )
         cls.post = Post.objects.create(
@@ -81,3 +87,103 @@ class PostCreateFormTests(TestCase):
             Post.objects.get(
                 id=self.post.id).text,
             form_data['text'])
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAILS=dict(
+    settings.POSTS_THUMBNAILS, ASYNC=False
+))
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='HASNoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(PostImageUploadTests.user)
+
+    def upload(self, size=(40, 20), **save_options):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', **save_options)
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+                ),
+            },
+        )
+
+    def test_image_exif_is_stripped(self):
+        """EXIF вырезается из загруженной картинки."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        response = self.upload(exif=exif.tobytes())
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        post = Post.objects.get(author=self.user)
+        with Image.open(post.image.path) as image:
+            self.assertNotIn('exif', image.info)
+
+    def test_orientation_is_applied(self):
+        """Поворот из EXIF переносится в пиксели, профиль ICC остаётся."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        icc_profile = ImageCms.ImageCmsProfile(
+            ImageCms.createProfile('sRGB')
+        ).tobytes()
+        response = self.upload(
+            size=(40, 20), exif=exif.tobytes(), icc_profile=icc_profile
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        post = Post.objects.get(author=self.user)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertNotIn('exif', image.info)
+            self.assertEqual(image.info.get('icc_profile'), icc_profile)
+
+    def test_mpo_is_saved_as_jpeg(self):
+        """Снимок MPO с телефона принимается и сохраняется как JPEG."""
+        buffer = BytesIO()
+        Image.new('RGB', (40, 20), 'red').save(
+            buffer, 'MPO', save_all=True,
+            append_images=[Image.new('RGB', (40, 20), 'blue')],
+        )
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Снимок с телефона',
+                'image': SimpleUploadedFile(
+                    'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+                ),
+            },
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        post = Post.objects.get(author=self.user)
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+
+    def test_too_large_file_is_rejected(self):
+        """Слишком большой файл отбрасывается при загрузке."""
+        limits = dict(settings.POSTS_IMAGE_UPLOAD, MAX_SIZE=100)
+        with override_settings(POSTS_IMAGE_UPLOAD=limits):
+            response = self.upload()
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.context['form'].errors['image'])
+        self.assertFalse(Post.objects.exists())
+
+    def test_too_many_pixels_are_rejected(self):
+        """Картинка с большим числом пикселей отбрасывается по заголовку."""
+        limits = dict(settings.POSTS_IMAGE_UPLOAD, MAX_PIXELS=100)
+        with override_settings(POSTS_IMAGE_UPLOAD=limits):
+            response = self.upload()
+        self.assertIn('40×20', response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
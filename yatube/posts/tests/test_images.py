@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from ..models import Post
+from ..templatetags.post_images import post_image_url, post_picture
+from ..thumbnails import check_sorl_compat, thumbnail_name
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SYNC_THUMBNAILS = dict(settings.POSTS_THUMBNAILS, ASYNC=False)
+
+
+def make_image(name='small.png', size=(40, 20), image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, image_format)
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), content_type=f'image/{image_format.lower()}'
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAILS=SYNC_THUMBNAILS
+)
+class PostThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ElenaRomm')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_thumbnail_is_generated_on_save(self):
+        """Миниатюра создаётся при сохранении поста с картинкой."""
+        post = Post.objects.create(
+            author=self.user, text='С картинкой', image=make_image()
+        )
+        url = post_image_url(post.image, '960x339', crop='center',
+                             upscale=True)
+        self.assertNotEqual(url, post.image.url)
+        self.assertTrue(url.startswith(settings.MEDIA_URL + 'cache/'))
+
+    def test_original_is_served_until_thumbnail_exists(self):
+        """Пока миниатюры нет, отдаётся оригинал."""
+        post = Post.objects.create(author=self.user, text='Без картинки')
+        post.image.save('other.png', make_image(), save=False)
+        Post.objects.filter(pk=post.pk).update(image=post.image.name)
+        url = post_image_url(post.image, '960x339', crop='center',
+                             upscale=True)
+        self.assertEqual(url, post.image.url)
+
+    def test_picture_lists_generated_variants(self):
+        """<picture> содержит все ширины и WebP-вариант."""
+        post = Post.objects.create(
+            author=self.user, text='С картинкой', image=make_image()
+        )
+        context = post_picture(post.image, '960x339', crop='center',
+                               upscale=True)
+        widths = settings.POSTS_THUMBNAILS['VARIANT_WIDTHS']
+        self.assertEqual(len(context['srcset'].split(', ')), len(widths))
+        webp = [source for source in context['sources']
+                if source['type'] == 'image/webp']
+        self.assertEqual(len(webp), 1)
+        self.assertIn(f'{widths[-1]}w', webp[0]['srcset'])
+
+    def test_thumbnail_name_matches_sorl(self):
+        """Имя миниатюры считается так же, как его строит сам sorl."""
+        post = Post.objects.create(
+            author=self.user, text='С картинкой', image=make_image()
+        )
+        for geometry, options in settings.POSTS_THUMBNAILS['SIZES']:
+            with self.subTest(geometry=geometry):
+                self.assertEqual(
+                    thumbnail_name(ImageFile(post.image), geometry, options),
+                    get_thumbnail(post.image, geometry, **options).name,
+                )
+
+    def test_missing_sorl_api_is_reported(self):
+        self.assertEqual(check_sorl_compat(None), [])
+        with mock.patch(
+            'posts.thumbnails.SORL_PRIVATE_API', ('_renamed_in_sorl',)
+        ):
+            errors = check_sorl_compat(None)
+            self.assertEqual([error.id for error in errors], ['posts.E001'])
+            with self.assertRaises(ImproperlyConfigured):
+                thumbnail_name(None, '960x339', {})
+
+    def test_unknown_size_is_rejected(self):
+        """Размер не из SIZES не ставится в очередь на каждом запросе."""
+        post = Post.objects.create(
+            author=self.user, text='С картинкой', image=make_image()
+        )
+        with mock.patch(
+            'posts.templatetags.post_images.schedule_thumbnails'
+        ) as schedule:
+            with self.assertRaises(ImproperlyConfigured):
+                post_image_url(post.image, '100x100')
+        schedule.assert_not_called()
@@ -1,6 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
-from ..models import Group, Post
+from django.test.utils import CaptureQueriesContext
+from ..models import Comment, Group, Post, UserStats
 
 
 User = get_user_model()
@@ -30,3 +35,123 @@ class PostModelTest(TestCase):
         """Проверяем, что у модели Group корректно работает __str__."""
         title_group = PostModelTest.group
         self.assertEqual(str(title_group), title_group.title)
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа2',
+            slug='test-slug2',
+            description='Тестовое описание2',
+        )
+
+    def assertCounters(self, author_count, group_count, group2_count):
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).posts_count, author_count
+        )
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count, group_count
+        )
+        self.assertEqual(
+            Group.objects.get(pk=self.group2.pk).posts_count, group2_count
+        )
+
+    def test_counters_follow_post_changes(self):
+        """Счётчики меняются при создании, смене группы и удалении."""
+        post = Post.objects.create(
+            author=self.user, text='Тестовый пост', group=self.group
+        )
+        Post.objects.create(author=self.user, text='Без группы')
+        self.assertCounters(2, 1, 0)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group2
+        post.save()
+        self.assertCounters(2, 0, 1)
+        post.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_recount_posts_command(self):
+        """Команда recount_posts восстанавливает счётчики."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}', group=self.group)
+            for i in range(3)
+        )
+        call_command('recount_posts', stdout=StringIO())
+        self.assertCounters(3, 3, 0)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев ведётся сигналами и пересчитывается."""
+        post = Post.objects.create(author=self.user, text='Тестовый пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        Comment.objects.create(post=post, author=self.user, text='Ещё один')
+        comment.delete()
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        call_command('recount_posts', stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+
+    def test_post_delete_does_not_grow_with_comments(self):
+        """Каскадное удаление комментариев не делает запросов на каждый."""
+        queries = []
+        for total in (1, 20):
+            post = Post.objects.create(author=self.user, text='Тестовый пост')
+            Comment.objects.bulk_create(
+                Comment(post=post, author=self.user, text=f'Ответ {i}')
+                for i in range(total)
+            )
+            with CaptureQueriesContext(connection) as captured:
+                post.delete()
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+        self.assertFalse(Comment.objects.exists())
+
+
+class PostRenderedTextTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    def test_save_renders_text(self):
+        post = Post.objects.create(
+            author=self.user, text='Первая <b>строка</b>\n\nВторая строка'
+        )
+        self.assertEqual(
+            post.text_html,
+            '<p>Первая &lt;b&gt;строка&lt;/b&gt;</p>\n\n<p>Вторая строка</p>',
+        )
+        self.assertEqual(post.excerpt, 'Первая <b>строка</b>\n\nВторая …')
+        post.text = 'Новый текст'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Новый текст</p>')
+
+    def test_render_posts_backfills_in_batches(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Текст {i}') for i in range(5)
+        )
+        out = StringIO()
+        call_command('render_posts', batch_size=2, only_missing=True,
+                     stdout=out)
+        self.assertIn('Обновлено постов: 5', out.getvalue())
+        self.assertFalse(Post.objects.filter(text_html='').exists())
+
+    def test_feed_loads_preview_only(self):
+        Post.objects.create(author=self.user, text='Слово ' * 100)
+        post = Post.objects.feed().get()
+        self.assertTrue(
+            {'text', 'text_html', 'image'} <= post.get_deferred_fields()
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(post.preview_html.endswith('…</p>'))
+            self.assertEqual(post.author.username, 'auth')
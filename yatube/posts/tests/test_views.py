@@ -1,9 +1,20 @@
+from datetime import timedelta
+from unittest import mock
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.middleware.csrf import _get_new_csrf_token
+from django.db import transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
 
-from ..models import Group, Post
+from ..cache import page_cache_stats
+from ..models import Comment, Follow, Group, Post
+from ..utils import ELLIPSIS, page_window
+from .utils import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -198,3 +209,588 @@ class PaginatorViewsTest(TestCase):
             )
         )
         self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_group_list_cursor_pages(self):
+        """Курсор ведёт на следующую страницу и обратно."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        first_page = self.guest_client.get(url).context['page_obj']
+        second_page = self.guest_client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), TEST_OF_POST - 10)
+        self.assertEqual(second_page.number, 2)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(set(first_page) & set(second_page))
+        back_page = self.guest_client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор отдаёт первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': self.user}),
+            {'cursor': 'broken'}
+        )
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+
+class FeedQueriesTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ElenaRomm')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug_slug',
+            description='Тестовое описание',
+        )
+        cls.feed_budgets = {
+            reverse('posts:index'): 3,
+            reverse(
+                'posts:group_list', kwargs={'slug': cls.group.slug}
+            ): 5,
+            reverse('posts:profile', kwargs={'username': cls.user}): 4,
+        }
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        for posts_count in (1, TEST_OF_POST):
+            Post.objects.bulk_create(
+                Post(text=f'Тестовый текст {i}',
+                     group=self.group,
+                     author=self.user)
+                for i in range(posts_count)
+            )
+            for url, budget in self.feed_budgets.items():
+                with self.subTest(url=url, posts_count=posts_count):
+                    self.assertQueryBudget(self.guest_client, url, budget)
+
+
+@override_settings(POSTS_PAGE_CACHE={
+    'ENABLED': True, 'CACHE': 'default', 'TIMEOUT': 60,
+})
+class FeedPageCacheTest(TransactionTestCase):
+    """Кэш сбрасывается в on_commit, поэтому транзакции настоящие."""
+
+    def setUp(self):
+        self.user = User.objects.create(username='ElenaRomm')
+        self.other_user = User.objects.create(username='HASNoName')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug_slug',
+            description='Тестовое описание',
+        )
+        self.profile_url = reverse(
+            'posts:profile', kwargs={'username': self.user}
+        )
+        self.other_profile_url = reverse(
+            'posts:profile', kwargs={'username': self.other_user}
+        )
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def assertHits(self, url, expected_hits):
+        before = page_cache_stats()['hits']
+        response = self.guest_client.get(url)
+        self.assertEqual(page_cache_stats()['hits'] - before, expected_hits)
+        return response
+
+    def test_anonymous_page_is_cached(self):
+        """Повторный анонимный запрос отдаётся из кэша."""
+        self.assertHits(self.profile_url, 0)
+        self.assertHits(self.profile_url, 1)
+        self.assertHits(self.profile_url + '?page=2', 0)
+
+    def test_authorized_user_is_not_cached(self):
+        """Авторизованному пользователю кэш не отдаётся."""
+        self.guest_client.get(self.profile_url)
+        before = page_cache_stats()
+        self.authorized_client.get(self.profile_url)
+        self.assertEqual(page_cache_stats(), before)
+
+    def test_new_post_invalidates_only_affected_pages(self):
+        """Новый пост сбрасывает ленты своего автора, группы и сайта."""
+        group_url = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug}
+        )
+        for url in (reverse('posts:index'), group_url, self.profile_url,
+                    self.other_profile_url):
+            self.guest_client.get(url)
+        Post.objects.create(
+            author=self.user, text='Новый пост', group=self.group
+        )
+        response = self.assertHits(self.profile_url, 0)
+        self.assertContains(response, 'Новый пост')
+        self.assertHits(reverse('posts:index'), 0)
+        self.assertHits(group_url, 0)
+        self.assertHits(self.other_profile_url, 1)
+
+    def test_pages_are_invalidated_after_commit(self):
+        """До коммита кэш не сбрасывается: иначе запрос между сбросом и
+        коммитом закэшировал бы ленту без нового поста."""
+        self.guest_client.get(self.profile_url)
+        with transaction.atomic():
+            Post.objects.create(author=self.user, text='Новый пост')
+            self.assertHits(self.profile_url, 1)
+        response = self.assertHits(self.profile_url, 0)
+        self.assertContains(response, 'Новый пост')
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ElenaRomm')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(author=self.user, text='Старый текст')
+
+    def test_card_is_rendered_from_cache_until_post_changes(self):
+        """Карточка берётся из кэша, пока пост не изменён."""
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), 'Старый текст'
+        )
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), 'Старый текст'
+        )
+        post = Post.objects.get(pk=self.post.pk)
+        post.save()
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), 'Новый текст'
+        )
+
+    def test_card_follows_group_rename(self):
+        """Переименование группы не оставляет в кэше старых ссылок."""
+        group = Group.objects.create(title='Группа', slug='old-slug')
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        self.assertContains(
+            self.guest_client.get(reverse('posts:index')), '/group/old-slug/'
+        )
+        group.slug = 'new-slug'
+        group.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, '/group/old-slug/')
+        self.assertContains(response, '/group/new-slug/')
+        group.delete()
+        self.assertNotContains(
+            self.guest_client.get(reverse('posts:index')), '/group/'
+        )
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ElenaRomm')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug_slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.in_group = Post.objects.create(
+            author=self.user, text='Про кошек и собак', group=self.group
+        )
+        self.no_group = Post.objects.create(
+            author=self.user, text='Кошки, кошки и снова кошки'
+        )
+
+    def search(self, **params):
+        response = self.guest_client.get(reverse('posts:search'), params)
+        return list(response.context['page_obj'])
+
+    def test_search_finds_indexed_posts(self):
+        """Поиск находит посты и учитывает фильтр по группе."""
+        self.assertEqual(set(self.search(q='кошки')), {self.no_group})
+        self.assertEqual(self.search(q='собак'), [self.in_group])
+        self.assertEqual(
+            self.search(q='собак', group=self.group.slug), [self.in_group]
+        )
+        self.assertEqual(self.search(q='кошки', group=self.group.slug), [])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        self.in_group.text = 'Теперь про хомяков'
+        self.in_group.save()
+        self.assertEqual(self.search(q='собак'), [])
+        self.assertEqual(self.search(q='хомяков'), [self.in_group])
+        self.in_group.delete()
+        self.assertEqual(self.search(q='хомяков'), [])
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ElenaRomm')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Тестовый текст', group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_unchanged_page_is_not_rendered(self):
+        """Повторный запрос с ETag получает 304 без рендера шаблона."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+
+    def test_edit_changes_etag(self):
+        """После правки поста страницы отдаются заново."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Новый текст')
+
+    def test_delete_is_not_hidden_by_if_modified_since(self):
+        """Удаление не самого нового поста не даёт устаревший 304."""
+        old_post = Post.objects.create(
+            author=self.user, text='Старый пост', group=self.group
+        )
+        Post.objects.filter(pk=old_post.pk).update(
+            modified=self.post.modified - timedelta(days=1)
+        )
+        for url in self.urls[:2]:
+            with self.subTest(url=url):
+                self.assertNotIn('Last-Modified', self.guest_client.get(url))
+        old_post.delete()
+        for url in self.urls[:2]:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_group_rename_changes_profile_etag(self):
+        """Профиль со ссылкой на группу отдаётся заново после её правки."""
+        url = self.urls[1]
+        etag = self.guest_client.get(url)['ETag']
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new_slug'
+        group.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, reverse('posts:group_list', kwargs={'slug': 'new_slug'})
+        )
+
+    def test_etag_depends_on_user(self):
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        url = self.urls[2]
+        self.assertNotEqual(
+            self.guest_client.get(url)['ETag'],
+            authorized_client.get(url)['ETag'],
+        )
+
+
+class PageWindowTest(TestCase):
+    def test_window(self):
+        self.assertEqual(page_window(1, 5), [1, 2, 3, 4, 5])
+        self.assertEqual(
+            page_window(50, 100),
+            [1, ELLIPSIS, 48, 49, 50, 51, 52, ELLIPSIS, 100],
+        )
+        self.assertEqual(page_window(99, 100), [1, ELLIPSIS, 97, 98, 99, 100])
+
+    def test_paginator_renders_only_window(self):
+        """Число ссылок не растёт вместе с числом страниц."""
+        user = User.objects.create(username='ElenaRomm')
+        url = reverse('posts:profile', kwargs={'username': user})
+        for total in (500, 1000):
+            Post.objects.bulk_create(
+                Post(author=user, text='Тестовый текст')
+                for _ in range(total - Post.objects.count())
+            )
+            response = self.client.get(url, {'page': 30})
+            with self.subTest(total=total):
+                self.assertEqual(
+                    response.content.decode().count('class="page-link"'),
+                    13,
+                )
+
+    @mock.patch('posts.views.FEED_COUNT_LIMIT', 20)
+    def test_window_count_is_limited(self):
+        """Окно страниц строится по COUNT(*), ограниченному сверху."""
+        user = User.objects.create(username='ElenaRomm')
+        group = Group.objects.create(title='Группа', slug='test-slug')
+        Post.objects.bulk_create(
+            Post(author=user, group=group, text='Тестовый текст')
+            for _ in range(30)
+        )
+        for url in (
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            reverse('posts:profile', kwargs={'username': user}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'page': 1})
+                self.assertEqual(
+                    response.context['page_obj'].paginator.count, 20
+                )
+
+
+class FeedChunkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ElenaRomm')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(TEST_OF_POST):
+            Post.objects.create(
+                author=cls.user, text=f'Тестовый текст {i}', group=cls.group
+            )
+        cls.urls = (
+            reverse('posts:index_chunk'),
+            reverse('posts:group_chunk', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile_chunk', kwargs={'username': cls.user}),
+        )
+
+    def test_cursor_walks_whole_feed(self):
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                ids = []
+                while url:
+                    data = self.client.get(url).json()
+                    ids.extend(post['id'] for post in data['posts'])
+                    url = data['next']
+                self.assertEqual(ids, expected)
+
+    def test_html_fragment(self):
+        response = self.client.get(self.urls[0], {'format': 'html'})
+        self.assertNotContains(response, '<html')
+        self.assertContains(response, '<article>', count=10)
+        self.assertContains(response, 'data-next-url="/chunks/?cursor=')
+
+    def test_session_is_not_touched(self):
+        """Ответ не зависит от пользователя и кэшируется публично."""
+        self.client.force_login(self.user)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertNotIn('Cookie', response.get('Vary', ''))
+                self.assertIn('public', response['Cache-Control'])
+
+
+class FollowViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='HasNoName')
+        cls.author = User.objects.create(username='ElenaRomm')
+        cls.other = User.objects.create(username='Stranger')
+        for i in range(TEST_OF_POST):
+            Post.objects.create(author=cls.author, text=f'Избранный {i}')
+        Post.objects.create(author=cls.other, text='Чужой пост')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow(self, author):
+        return self.authorized_client.post(reverse(
+            'posts:profile_follow', kwargs={'username': author}
+        ))
+
+    def test_follow_and_unfollow(self):
+        response = self.follow(self.author)
+        self.assertRedirects(response, reverse(
+            'posts:profile', kwargs={'username': self.author}
+        ))
+        self.follow(self.author)
+        self.assertEqual(Follow.objects.filter(
+            user=self.user, author=self.author
+        ).count(), 1)
+        self.authorized_client.post(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        ))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_get_does_not_change_follows(self):
+        """Ссылка или картинка на чужом сайте не подпишет пользователя."""
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                response = self.authorized_client.get(
+                    reverse(name, kwargs={'username': self.author})
+                )
+                self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_csrf_is_required(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}
+        ))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_etag_follows_csrf_secret(self):
+        """После смены CSRF-секрета форма не берётся из кеша браузера."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        client.get(url)  # первый ответ выдаёт CSRF-куку
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Так вход в систему меняет секрет.
+        client.cookies[settings.CSRF_COOKIE_NAME] = _get_new_csrf_token()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        token = response.context['csrf_token']
+        response = client.post(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}
+        ), {'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Follow.objects.exists())
+
+    def test_cannot_follow_self(self):
+        self.follow(self.user)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_feed_contains_only_followed_authors(self):
+        self.follow(self.author)
+        expected = list(
+            self.author.posts.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        feed_url = url = reverse('posts:follow_index')
+        ids = []
+        while True:
+            page_obj = self.authorized_client.get(url).context['page_obj']
+            ids.extend(post.pk for post in page_obj)
+            if not page_obj.has_next():
+                break
+            url = f'{feed_url}?cursor={page_obj.next_cursor}'
+        self.assertEqual(ids, expected)
+
+    def test_follow_changes_profile_etag(self):
+        url = reverse('posts:profile', kwargs={'username': self.author})
+        etag = self.authorized_client.get(url)['ETag']
+        self.follow(self.author)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отписаться')
+
+
+class CommentViewsTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='ElenaRomm')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый текст')
+        cls.post_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.pk}
+        )
+        cls.comment_url = reverse(
+            'posts:add_comment', kwargs={'post_id': cls.post.pk}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_authorized_user_comments(self):
+        response = self.authorized_client.post(
+            self.comment_url, {'text': 'Новый комментарий'}
+        )
+        self.assertRedirects(response, self.post_url)
+        self.assertContains(
+            self.authorized_client.get(self.post_url), 'Новый комментарий'
+        )
+
+    def test_new_comment_is_not_hidden_by_conditional_get(self):
+        """После комментария клиент со старым ETag получает страницу."""
+        etag = self.guest_client.get(self.post_url)['ETag']
+        self.authorized_client.post(self.comment_url, {'text': 'Свежий'})
+        response = self.guest_client.get(
+            self.post_url, HTTP_IF_NONE_MATCH=etag,
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежий')
+
+    def test_comment_changes_feed_etags(self):
+        """Счётчик на карточке не застревает в 304 у группы и профиля."""
+        group = Group.objects.create(title='Группа', slug='test-slug')
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+        self.authorized_client.post(self.comment_url, {'text': 'Первый'})
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Комментариев: 1')
+
+    def test_guest_cannot_comment(self):
+        self.guest_client.post(self.comment_url, {'text': 'Комментарий'})
+        self.assertFalse(Comment.objects.exists())
+
+    def test_comments_are_paginated_without_extra_queries(self):
+        """Страница поста — три запроса при любом числе комментариев."""
+        for total in (1, 45):
+            Comment.objects.bulk_create(
+                Comment(post=self.post, author=self.user, text=f'Ответ {i}')
+                for i in range(total - Comment.objects.count())
+            )
+            Post.objects.filter(pk=self.post.pk).update(comments_count=total)
+            with self.subTest(total=total):
+                self.assertQueryBudget(self.guest_client, self.post_url, 3)
+        response = self.guest_client.get(self.post_url, {'page': 3})
+        self.assertEqual(response.context['comments'].paginator.num_pages, 3)
+        self.assertEqual(len(response.context['comments']), 5)
+
+    def test_card_shows_comment_count(self):
+        """Число комментариев на карточке обновляется без правки поста."""
+        url = reverse('posts:index')
+        self.assertContains(self.guest_client.get(url), 'Комментариев: 0')
+        self.authorized_client.post(self.comment_url, {'text': 'Первый'})
+        self.assertContains(self.guest_client.get(url), 'Комментариев: 1')
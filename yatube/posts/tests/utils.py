@@ -0,0 +1,16 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в заданное число запросов."""
+
+    def assertQueryBudget(self, client, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'Страница {url} сделала {len(queries)} запросов '
+            f'при бюджете {budget}:\n'
+            + '\n'.join(query['sql'] for query in queries)
+        )
@@ -0,0 +1,178 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAILS['WORKERS'],
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+# Закрытые методы бэкенда sorl, без которых имя миниатюры не узнать,
+# не открывая картинку. Всё обращение к ним — в thumbnail_name().
+SORL_PRIVATE_API = ('_get_format', '_get_thumbnail_filename')
+
+
+def sorl_compat_errors():
+    backend = default.backend
+    return [
+        name for name in SORL_PRIVATE_API
+        if not callable(getattr(backend, name, None))
+    ]
+
+
+@register(Tags.compatibility)
+def check_sorl_compat(app_configs, **kwargs):
+    return [
+        Error(
+            f'В бэкенде sorl-thumbnail нет метода {name}: '
+            f'проверьте posts.thumbnails.thumbnail_name после обновления.',
+            id='posts.E001',
+        )
+        for name in sorl_compat_errors()
+    ]
+
+
+def thumbnail_name(source, geometry, options):
+    """Имя файла миниатюры, под которым её сохранит sorl.
+
+    Повторяет то, что делает get_thumbnail перед созданием миниатюры:
+    подставляет опции по умолчанию и строит имя. Тест сверяет результат
+    с настоящим get_thumbnail, так что обновление sorl не сломает это
+    молча.
+    """
+    missing = sorl_compat_errors()
+    if missing:
+        raise ImproperlyConfigured(
+            f'sorl-thumbnail без {", ".join(missing)}'
+        )
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def cached_thumbnail(image, geometry, **options):
+    """Готовая миниатюра из хранилища sorl или None.
+
+    Изображение при этом не открывается и не пересчитывается.
+    """
+    name = thumbnail_name(ImageFile(image), geometry, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def check_size(geometry, options):
+    """Размер должен быть в POSTS_THUMBNAILS['SIZES'].
+
+    Только эти размеры создаёт generate_thumbnails; для любого другого
+    миниатюра не появилась бы никогда, а создание ставилось бы в
+    очередь на каждом запросе.
+    """
+    if (geometry, options) not in settings.POSTS_THUMBNAILS['SIZES']:
+        raise ImproperlyConfigured(
+            f'Размер миниатюры {geometry} {options} не указан '
+            f"в POSTS_THUMBNAILS['SIZES']"
+        )
+
+
+def variant_formats():
+    """Современные форматы, которые умеют сохранять и Pillow, и sorl."""
+    Image.init()
+    return [
+        image_format
+        for image_format in settings.POSTS_THUMBNAILS['VARIANT_FORMATS']
+        if image_format in Image.SAVE and image_format in EXTENSIONS
+    ]
+
+
+def image_variants(geometry, options):
+    """Все производные одного размера: ширины × форматы.
+
+    Возвращает список (format, width, geometry, options); format None
+    означает формат миниатюры по умолчанию. Пропорции исходного
+    размера сохраняются.
+    """
+    width, height = (int(side) for side in geometry.split('x'))
+    variants = []
+    for image_format in [None] + variant_formats():
+        for variant_width in settings.POSTS_THUMBNAILS['VARIANT_WIDTHS']:
+            variant_options = dict(options)
+            if image_format is not None:
+                variant_options['format'] = image_format
+            variant_height = round(variant_width * height / width)
+            variants.append((
+                image_format,
+                variant_width,
+                f'{variant_width}x{variant_height}',
+                variant_options,
+            ))
+    return variants
+
+
+def generate_thumbnails(image_name):
+    """Создаёт все размеры из POSTS_THUMBNAILS['SIZES'] и их варианты."""
+    try:
+        for geometry, options in settings.POSTS_THUMBNAILS['SIZES']:
+            get_thumbnail(image_name, geometry, **options)
+            for *_, variant_geometry, variant_options in image_variants(
+                geometry, options
+            ):
+                get_thumbnail(image_name, variant_geometry, **variant_options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image_name)
+
+
+def _generate_in_worker(image_name):
+    try:
+        generate_thumbnails(image_name)
+    finally:
+        with _executor_lock:
+            _pending.discard(image_name)
+        # У потока-воркера свои соединения с базой, закрываем их сами.
+        connections.close_all()
+
+
+def _submit(image_name):
+    with _executor_lock:
+        if image_name in _pending:
+            return
+        _pending.add(image_name)
+    _get_executor().submit(_generate_in_worker, image_name)
+
+
+def schedule_thumbnails(image_name):
+    """Ставит создание миниатюр в фоновую очередь после коммита."""
+    if not settings.POSTS_THUMBNAILS['ASYNC']:
+        generate_thumbnails(image_name)
+        return
+    transaction.on_commit(lambda: _submit(image_name))
@@ -0,0 +1,259 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .models import Group, Post, TimelineEntry
+from .utils import CursorPaginator, WindowedPaginator
+
+INDEX_FEED = 'index'
+GROUP_FEED = 'group:{group_id}'
+
+
+def group_feeds(group_id):
+    if group_id is None:
+        return []
+    return [GROUP_FEED.format(group_id=group_id)]
+
+
+def post_feeds(group_id):
+    """Ленты, в которые попадает пост с этой группой."""
+    return [INDEX_FEED] + group_feeds(group_id)
+
+
+def all_feeds():
+    yield INDEX_FEED
+    for group_id in Group.objects.values_list('pk', flat=True).iterator():
+        yield GROUP_FEED.format(group_id=group_id)
+
+
+def feed_queryset(feed):
+    """Посты ленты в порядке ленты — эталон для пересборки и проверки."""
+    posts = Post.objects.order_by('-pub_date', '-pk')
+    if feed == INDEX_FEED:
+        return posts
+    group_id = int(feed.split(':', 1)[1])
+    return posts.filter(group_id=group_id)
+
+
+class DatabaseTimelineBackend:
+    """Ленты в таблице TimelineEntry, по строке на пост в ленте.
+
+    Хвост длиннее length обрезается не на каждой вставке, а на каждом
+    trim_every-м посте: до обрезки в ленте лежат лишние, но верные
+    записи, slice их не читает.
+    """
+
+    trim_every = 100
+
+    def __init__(self, length):
+        self.length = length
+
+    def push(self, feed, post):
+        TimelineEntry.objects.get_or_create(
+            feed=feed, post_id=post.pk,
+            defaults={'pub_date': post.pub_date},
+        )
+        if post.pk % self.trim_every == 0:
+            self.trim(feed)
+
+    def entries(self, feed):
+        # post_id, а не post: иначе Django подтягивает posts_post ради
+        # Post.Meta.ordering, и вместо обхода timeline_feed_idx идёт
+        # сортировка во временном B-дереве.
+        return TimelineEntry.objects.filter(feed=feed).order_by(
+            '-pub_date', '-post_id'
+        )
+
+    def trim(self, feed):
+        stale = list(
+            self.entries(feed).values_list('pk', flat=True)[self.length:]
+        )
+        if stale:
+            TimelineEntry.objects.filter(pk__in=stale).delete()
+
+    def remove(self, feed, post_id):
+        TimelineEntry.objects.filter(feed=feed, post_id=post_id).delete()
+
+    def clear(self, feed):
+        TimelineEntry.objects.filter(feed=feed).delete()
+
+    def slice(self, feed, start, stop):
+        # Записи за length ещё не обрезаны и могут быть неполными.
+        stop = self.length if stop is None else min(stop, self.length)
+        if start >= stop:
+            return []
+        return list(
+            self.entries(feed).values_list('post_id', flat=True)[start:stop]
+        )
+
+    def replace(self, feed, posts):
+        self.clear(feed)
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(feed=feed, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        )
+
+
+class CacheTimelineBackend:
+    """Ленты в кэше (locmem, Redis): список пар (время, id поста).
+
+    Блокировка защищает чтение-изменение-запись только внутри одного
+    процесса; между процессами расхождения лечит rebuild_timelines.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, length):
+        self.length = length
+        self.cache = caches[settings.POSTS_TIMELINE['CACHE']]
+
+    def _key(self, feed):
+        return f'posts:timeline:{feed}'
+
+    def _entries(self, feed):
+        return self.cache.get(self._key(feed), [])
+
+    def push(self, feed, post):
+        with self._lock:
+            entries = [
+                entry for entry in self._entries(feed) if entry[1] != post.pk
+            ]
+            entries.append((post.pub_date.timestamp(), post.pk))
+            entries.sort(reverse=True)
+            self.cache.set(self._key(feed), entries[:self.length], None)
+
+    def remove(self, feed, post_id):
+        with self._lock:
+            entries = self._entries(feed)
+            self.cache.set(
+                self._key(feed),
+                [entry for entry in entries if entry[1] != post_id],
+                None,
+            )
+
+    def clear(self, feed):
+        self.cache.delete(self._key(feed))
+
+    def slice(self, feed, start, stop):
+        return [pk for _, pk in self._entries(feed)[start:stop]]
+
+    def replace(self, feed, posts):
+        self.cache.set(
+            self._key(feed),
+            [(pub_date.timestamp(), pk) for pk, pub_date in posts],
+            None,
+        )
+
+
+_backend = {}
+
+
+def get_timeline_backend():
+    config = settings.POSTS_TIMELINE
+    key = (config['BACKEND'], config['LENGTH'], config.get('CACHE'))
+    if key not in _backend:
+        _backend[key] = import_string(config['BACKEND'])(config['LENGTH'])
+    return _backend[key]
+
+
+def add_to_timelines(post, feeds):
+    backend = get_timeline_backend()
+    for feed in feeds:
+        backend.push(feed, post)
+
+
+def remove_from_timelines(post_id, feeds):
+    backend = get_timeline_backend()
+    for feed in feeds:
+        backend.remove(feed, post_id)
+
+
+def rebuild_timeline(feed):
+    posts = feed_queryset(feed).values_list('pk', 'pub_date')
+    get_timeline_backend().replace(
+        feed, list(posts[:settings.POSTS_TIMELINE['LENGTH']])
+    )
+
+
+def check_timeline(feed):
+    """True, если лента совпадает с тем, что лежит в базе."""
+    length = settings.POSTS_TIMELINE['LENGTH']
+    expected = list(
+        feed_queryset(feed).values_list('pk', flat=True)[:length]
+    )
+    return get_timeline_backend().slice(feed, 0, length) == expected
+
+
+def timeline_rows(feed, queryset, start, stop, count):
+    """Посты ленты с start по stop: срез id из ленты и один in_bulk.
+
+    Если в ленте меньше id, чем должно быть по count (лента обрезана
+    по длине или ещё не собрана), строки берутся из queryset.
+    count=None — число постов неизвестно, тогда любая неполная
+    выборка из ленты проверяется по queryset.
+    """
+    ids = get_timeline_backend().slice(feed, start, stop)
+    expected = stop if count is None else min(stop, count)
+    if len(ids) < expected - start:
+        return list(queryset[start:stop])
+    posts = queryset.model.objects.feed().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
+
+
+class TimelineSequence:
+    """Срез ленты в виде последовательности для обычного Paginator."""
+
+    def __init__(self, feed, queryset):
+        self.feed = feed
+        self.queryset = queryset
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.queryset.count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        return timeline_rows(
+            self.feed, self.queryset, key.start or 0, key.stop, self.count()
+        )
+
+
+class TimelinePaginator(CursorPaginator):
+    """Страницы по номеру читаются из ленты, по курсору — из базы."""
+
+    def __init__(self, feed, object_list, per_page, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed = feed
+
+    def slice_rows(self, bottom, top):
+        # first_page() обходится без COUNT(*): число постов берётся,
+        # только если его уже посчитал переход по номеру страницы.
+        return timeline_rows(
+            self.feed, self.object_list, bottom, top,
+            self.__dict__.get('count'),
+        )
+
+
+def paginate_timeline(request, feed, queryset, post_per_page=10,
+                      count_limit=None):
+    # Срез уже ограничен LIMIT, курсор к нему не применить.
+    if not queryset.query.can_filter():
+        paginator = WindowedPaginator(
+            TimelineSequence(feed, queryset), post_per_page
+        )
+        return paginator.get_page(request.GET.get('page'))
+    paginator = TimelinePaginator(
+        feed, queryset, post_per_page, count_limit=count_limit
+    )
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.cursor_page(cursor)
+    return paginator.get_page(request.GET.get('page'))
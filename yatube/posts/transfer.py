@@ -0,0 +1,217 @@
+"""Потоковый импорт и экспорт постов в JSONL и CSV."""
+import copy
+import csv
+import json
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .counters import recount_posts, recount_posts_of
+from .models import Group, Post, User
+from .search import get_search_backend
+from .signals import invalidate_post_pages
+from .timeline import INDEX_FEED, all_feeds, group_feeds, rebuild_timeline
+
+FIELDS = ('author', 'group', 'text', 'pub_date', 'image')
+FORMATS = ('jsonl', 'csv')
+
+
+def read_rows(stream, file_format):
+    """Строки файла по одной, весь файл в память не читается."""
+    if file_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def write_rows(stream, file_format, rows):
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def export_rows(chunk_size=2000):
+    posts = Post.objects.order_by('pk').values_list(
+        'author__username', 'group__slug', 'text', 'pub_date', 'image'
+    )
+    for author, group, text, pub_date, image in posts.iterator(
+        chunk_size=chunk_size
+    ):
+        yield {
+            'author': author,
+            'group': group or '',
+            'text': text,
+            'pub_date': pub_date.isoformat(),
+            'image': image,
+        }
+
+
+def parse_pub_date(value):
+    pub_date = parse_datetime(value)
+    if pub_date is None:
+        # Иначе в базу ушёл бы NULL и импорт упал бы с IntegrityError.
+        raise ValueError(f'Некорректная дата pub_date: {value!r}')
+    return pub_date
+
+
+def insert_posts(posts):
+    """bulk_create, который пишет pub_date из объектов, а не текущее время.
+
+    auto_now_add выключается у копии поля только для этой вставки:
+    общее поле модели не трогаем, иначе посты, сохранённые в это время
+    другими потоками, остались бы без даты.
+    """
+    fields = []
+    for field in Post._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        if field.name == 'pub_date':
+            field = copy.copy(field)
+            field.auto_now_add = False
+        fields.append(field)
+    connection = connections[router.db_for_write(Post)]
+    batch_size = max(connection.ops.bulk_batch_size(fields, posts), 1)
+    for start in range(0, len(posts), batch_size):
+        Post._base_manager._insert(
+            posts[start:start + batch_size], fields=fields,
+            using=connection.alias,
+        )
+
+
+def refresh_derived_data(batch_size=1000):
+    """Пересобирает то, что обычно ведут сигналы: bulk_create их не шлёт."""
+    recount_posts(batch_size)
+    for feed in all_feeds():
+        rebuild_timeline(feed)
+    get_search_backend().rebuild()
+
+
+class PostImporter:
+    """Вставляет посты пачками по batch_size, транзакцией на
+    transaction_size строк.
+
+    Авторы и группы ищутся одним запросом на пачку и запоминаются.
+    Строки с неизвестным автором или группой пропускаются; с
+    create_authors неизвестные авторы создаются без пароля.
+    """
+
+    def __init__(self, batch_size=1000, transaction_size=10000,
+                 create_authors=False):
+        self.batch_size = batch_size
+        self.transaction_size = max(transaction_size, batch_size)
+        self.create_authors = create_authors
+        self.authors = {}
+        self.groups = {}
+        self.imported = 0
+        self.skipped = 0
+        # Что именно вставлено: по этому finish() досчитывает данные.
+        self.start_pk = None
+        self.author_ids = set()
+        self.group_ids = set()
+
+    def run(self, rows):
+        if self.start_pk is None:
+            self.start_pk = Post.objects.aggregate(Max('pk'))['pk__max'] or 0
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.transaction_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self.imported, self.skipped
+
+    def imported_posts(self):
+        return Post.objects.filter(pk__gt=self.start_pk)
+
+    def finish(self):
+        """Досчитывает счётчики, ленты и поисковый индекс и сбрасывает
+        кэш страниц — только для импортированных постов, их авторов
+        и групп, а не для всей таблицы."""
+        if not self.imported:
+            return
+        recount_posts_of(self.author_ids, self.group_ids, self.batch_size)
+        rebuild_timeline(INDEX_FEED)
+        for group_id in self.group_ids:
+            for feed in group_feeds(group_id):
+                rebuild_timeline(feed)
+        get_search_backend().index_posts(self.imported_posts())
+        invalidate_post_pages(self.author_ids, self.group_ids)
+
+    def import_chunk(self, rows):
+        imported = self.imported
+        try:
+            with transaction.atomic():
+                for start in range(0, len(rows), self.batch_size):
+                    self.import_batch(rows[start:start + self.batch_size])
+        except Exception:
+            # Транзакция откатилась: в imported только закоммиченное.
+            self.imported = imported
+            raise
+
+    def import_batch(self, rows):
+        self.resolve(rows)
+        now = timezone.now()
+        posts = []
+        for row in rows:
+            author_id = self.authors.get(row.get('author'))
+            group_slug = row.get('group') or None
+            group_id = self.groups.get(group_slug)
+            if author_id is None or (group_slug and group_id is None):
+                self.skipped += 1
+                continue
+            pub_date = row.get('pub_date')
+            post = Post(
+                text=row['text'],
+                author_id=author_id,
+                group_id=group_id,
+                pub_date=parse_pub_date(pub_date) if pub_date else now,
+                image=row.get('image') or '',
+            )
+            post.render_text()
+            posts.append(post)
+            self.author_ids.add(author_id)
+            if group_id is not None:
+                self.group_ids.add(group_id)
+        insert_posts(posts)
+        self.imported += len(posts)
+
+    def resolve(self, rows):
+        usernames = {row.get('author') for row in rows} - set(self.authors)
+        usernames.discard(None)
+        slugs = {row.get('group') for row in rows} - set(self.groups)
+        slugs.discard(None)
+        slugs.discard('')
+        if usernames:
+            self.authors.update(User.objects.filter(
+                username__in=usernames
+            ).values_list('username', 'pk'))
+            missing = usernames - set(self.authors)
+            if missing and self.create_authors:
+                password = make_password(None)
+                User.objects.bulk_create(
+                    User(username=username, password=password)
+                    for username in missing
+                )
+                self.authors.update(User.objects.filter(
+                    username__in=missing
+                ).values_list('username', 'pk'))
+            # Ненайденные тоже запоминаем, чтобы не искать их снова.
+            for username in usernames - set(self.authors):
+                self.authors[username] = None
+        if slugs:
+            self.groups.update(Group.objects.filter(
+                slug__in=slugs
+            ).values_list('slug', 'pk'))
+            for slug in slugs - set(self.groups):
+                self.groups[slug] = None
@@ -0,0 +1,82 @@
+from functools import wraps
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image
+
+IMAGE_FIELD = 'image'
+
+
+class PostImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку сразу во временный файл и проверяет лимиты на лету.
+
+    Размер проверяется на каждом куске, размеры картинки — как только
+    пришёл её заголовок. При превышении файл отбрасывается до того,
+    как он будет дочитан, а причина попадает в request.rejected_uploads.
+    """
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.config = settings.POSTS_IMAGE_UPLOAD
+        self.received = 0
+        self.header = b''
+        self.header_checked = field_name != IMAGE_FIELD
+        if (
+            self.content_length is not None
+            and self.content_length > self.config['MAX_SIZE']
+        ):
+            self.reject(self.size_error())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.config['MAX_SIZE']:
+            self.reject(self.size_error())
+        if not self.header_checked:
+            self.check_header(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self, raw_data):
+        self.header += raw_data
+        try:
+            # Image.open читает только заголовок, пиксели не декодируются.
+            width, height = Image.open(BytesIO(self.header)).size
+        except Exception:
+            if len(self.header) >= self.config['HEADER_SIZE']:
+                self.reject('Загрузите корректное изображение.')
+            return
+        self.header_checked = True
+        self.header = b''
+        if width * height > self.config['MAX_PIXELS']:
+            self.reject(
+                f'Слишком большое изображение: {width}×{height} пикселей.'
+            )
+
+    def size_error(self):
+        limit = self.config['MAX_SIZE'] // (1024 * 1024)
+        return f'Файл больше {limit} МБ.'
+
+    def reject(self, message):
+        rejected = getattr(self.request, 'rejected_uploads', {})
+        rejected[self.field_name] = message
+        self.request.rejected_uploads = rejected
+        raise SkipFile(message)
+
+
+def bounded_image_uploads(view):
+    """Подключает PostImageUploadHandler к view с формой поста.
+
+    Обработчики загрузки можно заменить только до чтения request.POST,
+    а CsrfViewMiddleware читает его раньше view, поэтому CSRF
+    проверяется уже после замены обработчиков.
+    """
+    protected_view = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.upload_handlers = [PostImageUploadHandler(request)]
+        return protected_view(request, *args, **kwargs)
+    return wrapper
@@ -1,13 +1,44 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     path('create/', views.post_create, name='post_create'),
+    path('search/', views.search, name='search'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('follow/', views.follow_index, name='follow_index'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/follow/', views.profile_follow,
+        name='profile_follow',
+    ),
+    path(
+        'profile/<str:username>/unfollow/', views.profile_unfollow,
+        name='profile_unfollow',
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/comment/', views.add_comment,
+        name='add_comment',
+    ),
+    path('feeds/<str:format>/', feeds.site_feed, name='site_feed'),
+    path(
+        'feeds/group/<slug:slug>/<str:format>/', feeds.group_feed,
+        name='group_feed',
+    ),
+    path(
+        'feeds/profile/<str:username>/<str:format>/', feeds.author_feed,
+        name='author_feed',
+    ),
+    path('chunks/', views.index_chunk, name='index_chunk'),
+    path(
+        'chunks/group/<slug:slug>/', views.group_chunk, name='group_chunk'
+    ),
+    path(
+        'chunks/profile/<str:username>/', views.profile_chunk,
+        name='profile_chunk',
+    ),
 ]
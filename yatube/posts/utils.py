@@ -1,8 +1,191 @@
-from django.core.paginator import Paginator
+from django.core import signing
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
+CURSOR_SALT = 'posts.cursor'
+KEYSET_ORDERING = ('-pub_date', '-pk')
+ELLIPSIS = '…'
 
-def paginate_page(request, post_list, post_per_page=10):
-    paginator = Paginator(post_list, post_per_page)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+
+def page_window(number, num_pages, on_each_side=2, on_ends=1):
+    """Номера страниц для ссылок: края, окрестность текущей и пропуски.
+
+    Например, для 7-й страницы из 100: 1 … 5 6 7 8 9 … 100.
+    Длина списка не зависит от числа страниц.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    window = []
+    if number > on_each_side + on_ends + 2:
+        window.extend(range(1, on_ends + 1))
+        window.append(ELLIPSIS)
+        window.extend(range(number - on_each_side, number + 1))
+    else:
+        window.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        window.extend(range(number + 1, number + on_each_side + 1))
+        window.append(ELLIPSIS)
+        window.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window.extend(range(number + 1, num_pages + 1))
+    return window
+
+
+class WindowedPage(Page):
+    @cached_property
+    def page_window(self):
+        return page_window(self.number, self.paginator.num_pages)
+
+
+class WindowedPaginator(Paginator):
+    """Обычный Paginator, страницы которого умеют page_window."""
+
+    ELLIPSIS = ELLIPSIS
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+
+class CursorPage(WindowedPage):
+    """Страница, полученная по ключу (pub_date, id), а не по OFFSET.
+
+    Наружу отдаёт тот же интерфейс, что и обычная страница Django,
+    плюс непрозрачные токены next_cursor / previous_cursor.
+    """
+
+    def __init__(self, object_list, number, paginator,
+                 has_next=False, has_previous=False):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.make_cursor(
+            self.object_list[-1], self.number + 1, forward=True
+        )
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.make_cursor(
+            self.object_list[0], self.number - 1, forward=False
+        )
+
+
+class CursorPaginator(WindowedPaginator):
+    """Пагинатор по ключу (pub_date, id).
+
+    Соседние страницы выбираются условием по ключу последней
+    (или первой) записи, поэтому стоимость запроса не зависит от
+    номера страницы. Переход по номеру (?page=N) по-прежнему работает
+    через OFFSET. Если задан count_limit, COUNT(*) ограничивается
+    этим числом строк и общее число страниц становится приблизительным.
+    """
+
+    def __init__(self, object_list, per_page, count_limit=None, **kwargs):
+        super().__init__(
+            object_list.order_by(*KEYSET_ORDERING), per_page, **kwargs
+        )
+        self.count_limit = count_limit
+
+    @cached_property
+    def count(self):
+        if self.count_limit is None:
+            return super().count
+        return self.object_list[:self.count_limit].count()
+
+    def make_cursor(self, post, number, forward=True):
+        return signing.dumps(
+            [post.pub_date.isoformat(), post.pk, number, forward],
+            salt=CURSOR_SALT,
+        )
+
+    def _page(self, rows, number, has_next, has_previous):
+        return CursorPage(
+            rows, number, self,
+            has_next=has_next, has_previous=has_previous,
+        )
+
+    def slice_rows(self, bottom, top):
+        return list(self.object_list[bottom:top])
+
+    def first_page(self):
+        """Первая страница без COUNT(*) — для лент, листаемых курсором."""
+        rows = self.slice_rows(0, self.per_page + 1)
+        return self._page(
+            rows[:self.per_page], 1,
+            has_next=len(rows) > self.per_page,
+            has_previous=False,
+        )
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = self.slice_rows(bottom, bottom + self.per_page + 1)
+        return self._page(
+            rows[:self.per_page], number,
+            has_next=len(rows) > self.per_page,
+            has_previous=number > 1,
+        )
+
+    def cursor_page(self, cursor):
+        """Страница по токену; битый токен даёт первую страницу."""
+        try:
+            pub_date, pk, number, forward = signing.loads(
+                cursor, salt=CURSOR_SALT
+            )
+            pub_date = parse_datetime(pub_date)
+        except (signing.BadSignature, TypeError, ValueError):
+            return self.get_page(1)
+        if pub_date is None:
+            return self.get_page(1)
+        limit = self.per_page + 1
+        if forward:
+            rows = list(self.object_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )[:limit])
+            return self._page(
+                rows[:self.per_page], number,
+                has_next=len(rows) > self.per_page,
+                has_previous=bool(rows),
+            )
+        rows = list(self.object_list.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).reverse()[:limit])
+        return self._page(
+            rows[:self.per_page][::-1], max(number, 1),
+            has_next=bool(rows),
+            has_previous=len(rows) > self.per_page,
+        )
+
+
+def paginate_page(request, post_list, post_per_page=10, count_limit=None):
+    # Срез уже ограничен LIMIT, курсор к нему не применить.
+    if not post_list.query.can_filter():
+        paginator = WindowedPaginator(post_list, post_per_page)
+        return paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(
+        post_list, post_per_page, count_limit=count_limit
+    )
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.cursor_page(cursor)
+    return paginator.get_page(request.GET.get('page'))
@@ -1,67 +1,201 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_POST
+
+from core.routers import read_from_replica
 
-from .forms import PostForm
-from .models import Group, Post, User
-from .utils import paginate_page
+from .cache import GROUP_SCOPE, INDEX_SCOPE, PROFILE_SCOPE, cache_feed_page
+from .conditional import (conditional_page, group_state, page_state,
+                          post_state, profile_state)
+from .forms import CommentForm, PostForm
+from .models import Follow, Group, Post, User
+from .search import get_search_backend
+from .timeline import (GROUP_FEED, INDEX_FEED, TimelinePaginator,
+                       paginate_timeline)
+from .uploadhandlers import bounded_image_uploads
+from .utils import CursorPaginator, WindowedPaginator, paginate_page
 
 PAGE_REPEAT = 10
+COMMENTS_PER_PAGE = 20
+# Точное число страниц длинных лент не нужно: COUNT(*) по ним
+# ограничен этим числом постов, дальше листают курсором.
+FEED_COUNT_LIMIT = 1000
 
 
+@read_from_replica
+@cache_feed_page(INDEX_SCOPE)
 def index(request):
-    post_list = Post.objects.all()[:PAGE_REPEAT]
-    paginator = paginate_page(
+    post_list = Post.objects.feed()[:PAGE_REPEAT]
+    paginator = paginate_timeline(
         request=request,
-        post_list=post_list,
+        feed=INDEX_FEED,
+        queryset=post_list,
     )
     context = {
         'page_obj': paginator,
-        'posts': post_list,
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@conditional_page(group_state)
+@cache_feed_page(GROUP_SCOPE)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = paginate_page(
+    posts = group.posts.feed()
+    paginator = paginate_timeline(
         request=request,
-        post_list=posts,
+        feed=GROUP_FEED.format(group_id=group.pk),
+        queryset=posts,
+        count_limit=FEED_COUNT_LIMIT,
     )
     context = {
-        'posts': posts,
         'group': group,
         'page_obj': paginator,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@conditional_page(profile_state)
+@cache_feed_page(PROFILE_SCOPE)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.feed()
     paginator = paginate_page(
         request=request,
         post_list=posts,
+        count_limit=FEED_COUNT_LIMIT,
     )
+    # Подписка уже проверена тем же запросом, что считал ETag.
+    following = bool(page_state(request)['is_followed'])
     context = {
         'author': author,
         'page_obj': paginator,
+        'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@read_from_replica
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    comments = WindowedPaginator(
+        post.comments.select_related('author').only(
+            'text', 'created', 'post_id', 'author__username'
+        ),
+        COMMENTS_PER_PAGE,
+    )
+    # Число страниц берём из счётчика поста, а не из COUNT(*).
+    comments.count = post.comments_count
     context = {
         'post': post,
+        'comments': comments.get_page(request.GET.get('page')),
+        'form': CommentForm(),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
 @login_required
+def add_comment(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    form = CommentForm(request.POST or None)
+    if form.is_valid():
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    group_slug = request.GET.get('group', '')
+    username = request.GET.get('author', '')
+    page_obj = None
+    if query:
+        posts = Post.objects.feed()
+        if group_slug:
+            posts = posts.filter(group__slug=group_slug)
+        if username:
+            posts = posts.filter(author__username=username)
+        results = get_search_backend().search(posts, query)
+        page_obj = WindowedPaginator(results, PAGE_REPEAT).get_page(
+            request.GET.get('page')
+        )
+    context = {
+        'query': query,
+        'group_slug': group_slug,
+        'username': username,
+        'groups': Group.objects.only('slug', 'title'),
+        'page_obj': page_obj,
+        'page_query': urlencode({
+            'q': query, 'group': group_slug, 'author': username,
+        }) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@login_required
+@read_from_replica
+def follow_index(request):
+    # Подзапрос по индексу unique_follow вместо списка id в Python:
+    # число подписок не влияет на размер запроса.
+    posts = Post.objects.feed().filter(
+        author__in=Follow.objects.filter(
+            user=request.user
+        ).values('author')
+    )
+    paginator = paginate_page(
+        request=request,
+        post_list=posts,
+        count_limit=FEED_COUNT_LIMIT,
+    )
+    context = {
+        'page_obj': paginator,
+    }
+    return render(request, 'posts/follow.html', context)
+
+
+@require_POST
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@require_POST
+@login_required
+def profile_unfollow(request, username):
+    Follow.objects.filter(
+        user=request.user, author__username=username
+    ).delete()
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+@bounded_image_uploads
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None,
+        rejected_uploads=getattr(request, 'rejected_uploads', None),
+    )
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
@@ -71,6 +205,7 @@ def post_create(request):
 
 
 @login_required
+@bounded_image_uploads
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -80,7 +215,8 @@ def post_edit(request, post_id):
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
-        instance=post
+        instance=post,
+        rejected_uploads=getattr(request, 'rejected_uploads', None),
     )
     if form.is_valid():
         form.save()
@@ -93,3 +229,81 @@ def post_edit(request, post_id):
             'post': post,
         }
     )
+
+
+def feed_chunk(request, paginator, show_group_link=True):
+    """Следующая порция ленты для бесконечной прокрутки.
+
+    ?cursor= — токен из предыдущего ответа, ?format=html — готовые
+    карточки вместо JSON. Пользователь и сессия не читаются: ответ
+    одинаков для всех и кэшируется и у нас, и у клиента.
+    """
+    cursor = request.GET.get('cursor')
+    page = paginator.cursor_page(cursor) if cursor else paginator.first_page()
+    response_format = request.GET.get('format')
+    next_url = None
+    if page.next_cursor:
+        next_url = request.path + '?' + urlencode({
+            'cursor': page.next_cursor, 'format': response_format or 'json',
+        })
+    if response_format == 'html':
+        # Без request: контекст-процессоры не нужны и трогают сессию.
+        return HttpResponse(render_to_string('posts/feed_chunk.html', {
+            'page_obj': page,
+            'show_group_link': show_group_link,
+            'next_url': next_url,
+        }))
+    return JsonResponse({
+        'posts': [
+            {
+                'id': post.pk,
+                'preview_html': post.preview_html,
+                'comments_count': post.comments_count,
+                'pub_date': post.pub_date.isoformat(),
+                'author': post.author.username,
+                'group': post.group and post.group.slug,
+                'url': reverse('posts:post_detail', args=[post.pk]),
+            }
+            for post in page
+        ],
+        'next': next_url,
+    })
+
+
+feed_api_cache = cache_control(
+    public=True, max_age=settings.POSTS_FEED_API['MAX_AGE']
+)
+
+
+@feed_api_cache
+@read_from_replica
+@cache_feed_page(INDEX_SCOPE, public=True)
+def index_chunk(request):
+    paginator = TimelinePaginator(
+        INDEX_FEED, Post.objects.feed(),
+        settings.POSTS_FEED_API['PAGE_SIZE'],
+    )
+    return feed_chunk(request, paginator)
+
+
+@feed_api_cache
+@read_from_replica
+@cache_feed_page(GROUP_SCOPE, public=True)
+def group_chunk(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    paginator = TimelinePaginator(
+        GROUP_FEED.format(group_id=group.pk), group.posts.feed(),
+        settings.POSTS_FEED_API['PAGE_SIZE'],
+    )
+    return feed_chunk(request, paginator, show_group_link=False)
+
+
+@feed_api_cache
+@read_from_replica
+@cache_feed_page(PROFILE_SCOPE, public=True)
+def profile_chunk(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    paginator = CursorPaginator(
+        author.posts.feed(), settings.POSTS_FEED_API['PAGE_SIZE']
+    )
+    return feed_chunk(request, paginator)
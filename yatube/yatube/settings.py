@@ -35,6 +35,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,8 +52,16 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Шаблоны компилируются один раз на процесс и греются при
+            # старте (yatube/wsgi.py); в разработке правка шаблона
+            # сбрасывает кэш (core/template_cache.py).
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -72,9 +82,136 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, прагмы не применяются заново.
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Реплики для чтения лент: алиасы из DATABASES. Локально — вторая
+# база SQLite, например 'replica': {'ENGINE': ..., 'NAME': 'replica.sqlite3',
+# 'TEST': {'MIRROR': 'default'}} и копия db.sqlite3 в неё.
+# После записи пользователь STICKY_SECONDS читает из основной базы.
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': 15,
+    'COOKIE_NAME': 'pin_primary',
+}
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Прагмы для каждого нового соединения с SQLite (core/db.py):
+# WAL, чтобы запись не блокировала чтение, mmap и кэш страниц
+# (отрицательный cache_size — в КиБ) и ожидание блокировки в мс.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,
+    'busy_timeout': 5000,
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Кэш страниц лент для анонимных пользователей. CACHE — алиас из
+# CACHES: подойдёт locmem, filebased или локальный Redis.
+POSTS_PAGE_CACHE = {
+    'ENABLED': False,
+    'CACHE': 'default',
+    'TIMEOUT': 60 * 5,
+}
+
+# Порции лент для бесконечной прокрутки (/chunks/...): постов в ответе
+# и сколько секунд клиент и CDN могут не перезапрашивать ответ.
+POSTS_FEED_API = {
+    'PAGE_SIZE': 10,
+    'MAX_AGE': 30,
+}
+
+# RSS, Atom и JSON Feed (/feeds/...): сколько последних постов в ленте
+# и где хранить готовые ленты (ключ — ETag, меняется вместе с постами).
+POSTS_SYNDICATION = {
+    'LENGTH': 20,
+    'CACHE': 'default',
+    'TIMEOUT': 60 * 60 * 24,
+}
+
+# Кэш HTML карточек постов в лентах; ключ меняется вместе с Post.modified.
+POSTS_CARD_CACHE = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'TIMEOUT': 60 * 60,
+}
+
+# Миниатюры картинок постов создаются после сохранения поста в фоновых
+# потоках; пока миниатюры нет, страница показывает оригинал.
+# Для каждого размера дополнительно создаются варианты для srcset:
+# ширины VARIANT_WIDTHS в исходном формате и в VARIANT_FORMATS
+# (форматы, которые не поддерживает Pillow, пропускаются).
+POSTS_THUMBNAILS = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    'SIZES': [
+        ('960x339', {'crop': 'center', 'upscale': True}),
+    ],
+    'VARIANT_WIDTHS': [480, 960, 1440],
+    'VARIANT_FORMATS': ['AVIF', 'WEBP'],
+}
+
+# Ограничения на картинку поста. Размер и число пикселей проверяются
+# ещё во время загрузки, EXIF вырезается при сохранении формы.
+POSTS_IMAGE_UPLOAD = {
+    'MAX_SIZE': 5 * 1024 * 1024,
+    'MAX_PIXELS': 25_000_000,
+    'HEADER_SIZE': 64 * 1024,
+    # MPO — JPEG с телефонов с несколькими кадрами, сохраняется как JPEG.
+    'FORMATS': ['JPEG', 'MPO', 'PNG', 'GIF', 'WEBP'],
+}
+
+# Движок поиска по постам: SQLiteFTSBackend (FTS5), PostgresSearchBackend
+# или LikeSearchBackend без индекса.
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
+# Предвычисленные ленты (общая и по группам): последние LENGTH id постов.
+# BACKEND — DatabaseTimelineBackend (таблица) или CacheTimelineBackend
+# (кэш из CACHES с алиасом CACHE, например локальный Redis). Таблицу
+# заполняет миграция, ленты в кэше — команда rebuild_timelines.
+POSTS_TIMELINE = {
+    'BACKEND': 'posts.timeline.DatabaseTimelineBackend',
+    'CACHE': 'default',
+    'LENGTH': 1000,
+}
+
+# Замеры view: доля запросов в выборке (0 — middleware выключен) и
+# период вывода сводки в лог, в секундах. Сводка — /admin/metrics/.
+METRICS = {
+    'SAMPLE_RATE': 0,
+    'LOG_INTERVAL': 60,
+}
+
+# Сводка замеров пишется с уровнем INFO, а корневой логгер по умолчанию
+# пропускает только WARNING и выше.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'metrics': {
+            'class': 'logging.StreamHandler',
+            'level': 'INFO',
+        },
+    },
+    'loggers': {
+        'yatube.metrics': {
+            'handlers': ['metrics'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 